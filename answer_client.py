@@ -0,0 +1,33 @@
+import json
+import os
+import urllib.request
+
+# 답변 서버 주소 (예: http://127.0.0.1:8600). 비어 있으면 이 프로세스에서 직접 답변
+SERVER_URL = os.environ.get("EDU_CHATBOT_SERVER", "").rstrip("/")
+TIMEOUT = float(os.environ.get("EDU_CHATBOT_TIMEOUT", "30"))
+
+
+# 서버 없이 직접 답변할 때는 모델과 인덱스를 미리 백그라운드에서 불러 둠 (첫 질문 대기 시간 줄이기)
+def prewarm(collection):
+    if not SERVER_URL:
+        from lazy_loader import LOADER
+
+        LOADER.start([collection])
+
+
+# 질문하기 -> {"answer": ..., "collection": ..., "latency_ms": ...} (문화유산은 item_id, same_name_ids 포함)
+def ask(collection, question, shown_ids=()):
+    if not SERVER_URL:
+        from answer_server import answer_question
+        from retrieval_engine import get_engine
+
+        return answer_question(get_engine(), collection, question, shown_ids)
+
+    body = json.dumps({"collection": collection, "question": question, "shown_ids": list(shown_ids)}, ensure_ascii=False)
+    request = urllib.request.Request(
+        SERVER_URL + "/ask",
+        data=body.encode("utf-8"),
+        headers={"Content-Type": "application/json; charset=utf-8"},
+    )
+    with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+        return json.loads(response.read().decode("utf-8"))
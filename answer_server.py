@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from micro_batch import MicroBatcher
+from retrieval_engine import HeritageCollection, get_engine, heritage_card
+from tracing import METRICS, annotate, request
+
+HERITAGE_EMPTY_ANSWER = "더 이상 조건에 맞는 문화유산을 찾을 수 없습니다."
+
+
+# 질문 하나 답변 -> JSON으로 보낼 수 있는 dict
+#   키워드 규칙에 맞으면 모델 없이 바로 답변
+#   문화유산은 이미 보여준 항목(shown_ids)을 빼고 추천, 나머지는 batcher(있으면)로 모아서 검색
+#   단계별 시간은 tracing.request로 기록 (화면에서 이미 기록 중이면 그 기록에 더함)
+#   route: 이미 구한 engine.route 결과 (주면 다시 라우팅하지 않음)
+def answer_question(engine, name, question, shown_ids=(), batcher=None, route=None):
+    started = time.perf_counter()
+    name = engine.resolve(name)
+    with request("ask", collection=name):
+        if route is None:
+            route = engine.route(name, question)
+        collection = None if "answer" in route else engine.collection(name)
+        if collection is None:
+            result = {"answer": route["answer"], "routed": True}
+        elif isinstance(collection, HeritageCollection):
+            annotate(route="heritage")
+            picked = collection.recommend(question, set(shown_ids))
+            if picked is None:
+                result = {"answer": HERITAGE_EMPTY_ANSWER, "item_id": None}
+            else:
+                item_id, score = picked
+                result = {
+                    "answer": heritage_card(collection.entries[item_id], score),
+                    "item_id": item_id,
+                    "score": score,
+                    "same_name_ids": collection.filters.same_name_ids(item_id),
+                }
+        elif route or batcher is None:
+            result = {"answer": collection.answer(question, **route)}
+        else:
+            annotate(batched=True)
+            result = {"answer": batcher(question)}
+    result["collection"] = name
+    result["latency_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+# 모델 1벌을 공유하는 작업자 풀 + 컬렉션별 요청 모으기(micro-batching)
+class AnswerService:
+    def __init__(self, engine, workers=4, window_ms=10, max_batch=32):
+        self.engine = engine
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    # 배치마다 engine.collection(name)을 다시 찾아서 지식 파일이 바뀌면 새 컬렉션으로 답함
+    def batcher(self, name):
+        with self._lock:
+            if name not in self._batchers:
+                def answer_batch(questions):
+                    return self.engine.collection(name).answer_batch(questions)
+
+                self._batchers[name] = MicroBatcher(answer_batch, self.window_ms, self.max_batch, executor=self.pool)
+            return self._batchers[name]
+
+    def ask(self, name, question, shown_ids=()):
+        name = self.engine.resolve(name)
+        if isinstance(self.engine.collection(name), HeritageCollection):
+            # 문화유산은 요청마다 필터가 달라서 작업자 풀에서 하나씩 처리
+            return self.pool.submit(answer_question, self.engine, name, question, shown_ids).result()
+        return answer_question(self.engine, name, question, batcher=self.batcher(name))
+
+    # 문화유산 항목 번호 범위를 벗어난 shown_ids (다른 컬렉션은 shown_ids를 쓰지 않음)
+    def invalid_ids(self, name, shown_ids):
+        collection = self.engine.collection(name)
+        if not isinstance(collection, HeritageCollection):
+            return []
+        return [i for i in shown_ids if not 0 <= i < len(collection.entries)]
+
+    def stats(self):
+        with self._lock:
+            return {name: batcher.stats() for name, batcher in self._batchers.items()}
+
+
+def make_handler(service):
+    class AnswerHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "collections": service.engine.names(), "batching": service.stats()})
+            elif self.path == "/metrics":
+                data = METRICS.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            else:
+                self._send(404, {"error": "not found"})
+
+        # POST /ask {"collection": "jeju_busan", "question": "...", "shown_ids": [...]}
+        def do_POST(self):
+            if self.path != "/ask":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+            if not isinstance(body, dict):
+                self._send(400, {"error": "요청 본문은 JSON 객체여야 합니다."})
+                return
+            question = body.get("question", "")
+            collection = body.get("collection", "knowledge")
+            shown_ids = body.get("shown_ids", [])
+            if not isinstance(question, str) or not isinstance(collection, str):
+                self._send(400, {"error": "question과 collection은 문자열이어야 합니다."})
+                return
+            # bool도 int이므로 따로 뺌
+            if not isinstance(shown_ids, list) or any(isinstance(i, bool) or not isinstance(i, int) for i in shown_ids):
+                self._send(400, {"error": "shown_ids는 정수 목록이어야 합니다."})
+                return
+            question = question.strip()
+            if not question:
+                self._send(400, {"error": "질문을 입력해주세요."})
+                return
+            # 404는 컬렉션 이름을 찾지 못했을 때만 (답변 중에 난 KeyError는 아래에서 500)
+            try:
+                name = service.engine.resolve(collection)
+            except KeyError as e:
+                self._send(404, {"error": e.args[0] if e.args else str(e)})
+                return
+            try:
+                invalid = service.invalid_ids(name, shown_ids)
+                if invalid:
+                    self._send(400, {"error": f"shown_ids에 없는 항목 번호가 있습니다: {invalid}"})
+                    return
+                result = service.ask(name, question, shown_ids)
+            except Exception as e:
+                # 답변 중 예상하지 못한 오류도 연결을 끊지 않고 알려 줌
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+                return
+            self._send(200, result)
+
+        def log_message(self, format, *args):
+            pass
+
+    return AnswerHandler
+
+
+# 사용 예: python answer_server.py --port 8600 --workers 4 --window-ms 10 --preload jeju_busan heritage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streamlit 화면들이 함께 쓰는 답변 서버")
+    parser.add_argument("--host", default=os.environ.get("EDU_CHATBOT_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("EDU_CHATBOT_PORT", "8600")))
+    parser.add_argument("--workers", type=int, default=4, help="작업자 스레드 수")
+    parser.add_argument("--window-ms", type=float, default=10, help="요청을 모으는 시간(ms)")
+    parser.add_argument("--max-batch", type=int, default=32, help="한 번에 처리할 최대 질문 수")
+    parser.add_argument("--preload", nargs="*", default=[], help="시작할 때 미리 불러올 컬렉션")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    for name in args.preload:
+        engine.collection(engine.resolve(name))
+    service = AnswerService(engine, args.workers, args.window_ms, args.max_batch)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"답변 서버 시작: http://{args.host}:{args.port}/ask")
+    server.serve_forever()
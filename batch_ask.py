@@ -0,0 +1,90 @@
+import argparse
+import csv
+import json
+import time
+
+from retrieval_engine import FALLBACK_ANSWER, HeritageCollection, get_engine
+
+
+# 질문 파일 읽기: JSONL({"question": ...}) 또는 CSV(question 열). 다른 열(예: expected)은 그대로 결과에 남김
+def load_questions(path):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            return [row for row in csv.DictReader(f) if row.get("question")]
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# 결과의 답변 텍스트
+def entry_text(entry):
+    return entry["full"] if "full" in entry else entry.get("이름", "")
+
+
+# 질문 목록을 배치로 처리: 챗봇과 같이 사실 표/키워드 규칙(engine.route)을 먼저 보고,
+#   남은 질문은 배치마다 인코딩 1번 + 검색 1번 (규칙이 검색 범위를 좁힌 질문은 하나씩 검색)
+def ask_batch(engine, name, rows, k=3, batch_size=256):
+    collection = engine.collection(name)
+    results = []
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        started = time.perf_counter()
+        routes = [engine.route(name, row["question"]) for row in batch]
+        plain = [i for i, route in enumerate(routes) if not route]
+        hits = [[] for _ in batch]
+        for i, row_hits in zip(plain, collection.search_batch([batch[i]["question"] for i in plain], k=k, batch_size=batch_size)):
+            hits[i] = row_hits
+        for i, route in enumerate(routes):
+            if route and "answer" not in route:
+                hits[i] = collection.search(batch[i]["question"], k=k, ids=route.get("ids"))
+        latency_ms = (time.perf_counter() - started) * 1000 / len(batch)
+
+        for row, route, row_hits in zip(batch, routes, hits):
+            if "answer" in route:
+                answer = route["answer"]
+            elif isinstance(collection, HeritageCollection):
+                answer = entry_text(row_hits[0][1]) if row_hits else ""
+            elif collection.accepts(row_hits):
+                answer = entry_text(row_hits[0][1])
+            else:
+                answer = route.get("fallback", FALLBACK_ANSWER)
+            results.append({
+                **row,
+                "answer": answer,
+                "candidates": [entry_text(entry) for _, entry in row_hits],
+                "scores": [score for score, _ in row_hits],
+                "latency_ms": round(latency_ms, 3),
+            })
+    return results
+
+
+def write_results(path, results):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            fields = list(dict.fromkeys(key for row in results for key in row))
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for row in results:
+                writer.writerow({key: json.dumps(v, ensure_ascii=False) if isinstance(v, list) else v for key, v in row.items()})
+        else:
+            for row in results:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+# 사용 예: python batch_ask.py questions.jsonl jeju_busan_json2.txt -o answers.jsonl -k 3
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="질문 파일을 한 번에 답변하는 오프라인 평가 도구")
+    parser.add_argument("questions", help="질문 파일 (.jsonl 또는 .csv)")
+    parser.add_argument("corpus", help="컬렉션 이름 또는 지식 파일 이름 (예: energy3.txt, busan_heritage.json)")
+    parser.add_argument("-o", "--output", default="answers.jsonl", help="결과 파일 (.jsonl 또는 .csv)")
+    parser.add_argument("-k", type=int, default=3, help="질문마다 가져올 후보 수")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    engine = get_engine()
+    name = engine.resolve(args.corpus)
+    rows = load_questions(args.questions)
+
+    started = time.perf_counter()
+    results = ask_batch(engine, name, rows, k=args.k, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - started
+    write_results(args.output, results)
+    print(f"{len(results)}개 질문 답변 완료: {elapsed:.2f}초 ({args.output})")
@@ -0,0 +1,304 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from faiss_store import build_index, set_search_knobs
+from heritage_embeddings import HERITAGE_FILE, heritage_sentence
+from heritage_filters import HeritageIndex
+from query_cache import QUERY_CACHE
+from retrieval_engine import COLLECTIONS, RetrievalEngine, load_entries
+
+MODELS = ["kykim/bert-kor-base", "jhgan/ko-sbert-sts", "paraphrase-MiniLM-L6-v2"]
+INDEX_KINDS = ["flat", "hnsw", "ivf", "ivfpq"]
+NPROBES = [1, 4, 16, 64]
+EF_SEARCHES = [16, 64, 256]
+
+# 교실에서 자주 나오는 질문 예시
+SAMPLE_QUESTIONS = [
+    "부산 인구", "제주도 면적", "여름 기온", "해운대구 인구는?", "플라스틱 쓰레기",
+    "에어컨 보급률", "1인당 온실가스", "부산 겨울 강수량", "가장 인구가 많은 구",
+    "조선시대 해운대구 유형문화유산 알려줘", "동래구 무형유산", "금정구 문화유산",
+]
+
+
+# 이 프로세스의 최대 메모리 (모델마다 따로 프로세스를 띄워 재면 모델별 값)
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def latency_stats(samples_ms):
+    samples = np.asarray(samples_ms)
+    return {
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "mean_ms": float(samples.mean()),
+        "throughput_qps": float(1000 / samples.mean()) if samples.mean() > 0 else 0.0,
+    }
+
+
+def timed_ms(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def load_model(model_name):
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name, device="cpu")
+
+
+# 지식 파일 하나: 전체 인코딩, 인덱스 구축, 질문 인코딩/검색/인코딩+검색 지연 시간 (라우팅, BM25, 재정렬은 빼고 모델과 FAISS만)
+def bench_corpus(model, sentences, questions, repeat):
+    encode_ms, embeddings = timed_ms(lambda: model.encode(sentences, convert_to_numpy=True, normalize_embeddings=True, batch_size=64))
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    def build():
+        index = faiss.IndexFlatIP(embeddings.shape[1])
+        index.add(embeddings)
+        return index
+
+    build_ms, index = timed_ms(build)
+    k = min(2, index.ntotal)
+
+    encode_samples, search_samples, total_samples = [], [], []
+    for _ in range(repeat):
+        for question in questions:
+            q_ms, query_vec = timed_ms(lambda: model.encode([question], convert_to_numpy=True, normalize_embeddings=True))
+            s_ms, _ = timed_ms(lambda: index.search(np.asarray(query_vec, dtype=np.float32), k))
+            encode_samples.append(q_ms)
+            search_samples.append(s_ms)
+            total_samples.append(q_ms + s_ms)
+
+    return {
+        "size": len(sentences),
+        "corpus_encode_ms": encode_ms,
+        "corpus_encode_per_sentence_ms": encode_ms / max(len(sentences), 1),
+        "index_build_ms": build_ms,
+        "query_encode": latency_stats(encode_samples),
+        "search": latency_stats(search_samples),
+        "encode_and_search": latency_stats(total_samples),
+    }
+
+
+# 실제 답변 경로 engine.answer(사실 표/규칙 라우팅, 질문 캐시, BM25 + FAISS, 재정렬, 기준값)의 질문당 지연 시간
+#   컬렉션 설정의 모델만 측정하는 모델로 바꾼 엔진을 쓰고, 모델/인덱스 로드 시간은 빼고 잼
+#   end_to_end: 질문 캐시를 비운 첫 번째 반복, end_to_end_cached: 같은 질문을 다시 물은 나머지 반복
+def bench_answers(model_name, questions, repeat):
+    engine = RetrievalEngine({name: dict(spec, model=model_name) for name, spec in COLLECTIONS.items()})
+    results = {}
+    for name in engine.names():
+        engine.collection(name)
+        QUERY_CACHE.clear()
+        cold = [timed_ms(lambda: engine.answer(name, question))[0] for question in questions]
+        warm = [timed_ms(lambda: engine.answer(name, question))[0] for _ in range(repeat - 1) for question in questions]
+        results[name] = {"end_to_end": latency_stats(cold)}
+        if warm:
+            results[name]["end_to_end_cached"] = latency_stats(warm)
+    return results
+
+
+# busan_heritage.json을 scale배로 늘린 합성 데이터: 인덱스 구축, 검색, 필터+점수 계산 지연 시간
+#   (수십만 문장 인코딩은 너무 오래 걸리므로 원본 임베딩을 복제하고 작은 잡음을 더함)
+def scaled_embeddings(base_embeddings, scale, seed=0):
+    rng = np.random.default_rng(seed)
+    embeddings = np.tile(base_embeddings, (scale, 1))
+    embeddings += rng.normal(0, 0.01, embeddings.shape).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+
+# 인덱스 구조(flat / hnsw / ivf / ivfpq)와 조절값(nprobe, efSearch)별 구축 시간, 크기, 검색 지연, flat 대비 recall@k
+def bench_index_kinds(embeddings, query_vecs, kinds=INDEX_KINDS, nprobes=NPROBES, ef_searches=EF_SEARCHES, k=10, repeat=1):
+    k = min(k, len(embeddings))
+    _, truth = build_index(embeddings, "flat").search(query_vecs, k)
+    results = []
+    for kind in kinds:
+        build_ms, index = timed_ms(lambda: build_index(embeddings, kind))
+        size_mb = faiss.serialize_index(index).nbytes / 1024 / 1024
+        if kind in ("ivf", "ivfpq"):
+            knobs = [{"nprobe": n} for n in nprobes]
+        elif kind == "hnsw":
+            knobs = [{"ef_search": e} for e in ef_searches]
+        else:
+            knobs = [{}]
+        for knob in knobs:
+            set_search_knobs(index, **knob)
+            samples = []
+            for _ in range(repeat):
+                for query_vec in query_vecs:
+                    ms, _ = timed_ms(lambda: index.search(query_vec.reshape(1, -1), k))
+                    samples.append(ms)
+            _, found = index.search(query_vecs, k)
+            recall = float(np.mean([len(set(a) & set(b)) / k for a, b in zip(found, truth)]))
+            results.append({
+                "kind": kind,
+                **knob,
+                "build_ms": build_ms,
+                "size_mb": size_mb,
+                f"recall_at_{k}": recall,
+                "search": latency_stats(samples),
+            })
+    return results
+
+
+def bench_scaled_heritage(model, items, base_embeddings, questions, scale, repeat, seed=0, index_kinds=None, nprobes=NPROBES, ef_searches=EF_SEARCHES):
+    embeddings = scaled_embeddings(base_embeddings, scale, seed)
+    scaled_items = [dict(item, 이름=f"{item.get('이름', '')}#{copy}") for copy in range(scale) for item in items]
+
+    filter_build_ms, filters = timed_ms(lambda: HeritageIndex(scaled_items))
+
+    def build():
+        index = faiss.IndexFlatIP(embeddings.shape[1])
+        index.add(embeddings)
+        return index
+
+    build_ms, index = timed_ms(build)
+    query_vecs = model.encode(questions, convert_to_numpy=True, normalize_embeddings=True)
+    query_vecs = np.asarray(query_vecs, dtype=np.float32)
+
+    search_samples, filter_samples = [], []
+    for _ in range(repeat):
+        for question, query_vec in zip(questions, query_vecs):
+            s_ms, _ = timed_ms(lambda: index.search(query_vec.reshape(1, -1), 10))
+            f_ms, _ = timed_ms(lambda: embeddings[filters.filter(*filters.parse_question(question))] @ query_vec)
+            search_samples.append(s_ms)
+            filter_samples.append(f_ms)
+
+    result = {
+        "scale": scale,
+        "size": len(scaled_items),
+        "filter_index_build_ms": filter_build_ms,
+        "index_build_ms": build_ms,
+        "search": latency_stats(search_samples),
+        "filter_and_score": latency_stats(filter_samples),
+    }
+    if index_kinds:
+        # 교실 질문 + 원본 문장을 조금 바꾼 질문 (근사 인덱스가 놓치기 쉬운 가까운 이웃)
+        rng = np.random.default_rng(seed + 1)
+        probes = embeddings[rng.choice(len(embeddings), min(200, len(embeddings)), replace=False)]
+        probes = probes + rng.normal(0, 0.05, probes.shape).astype(np.float32)
+        probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+        result["index_kinds"] = bench_index_kinds(embeddings, np.vstack([query_vecs, probes]), index_kinds, nprobes, ef_searches)
+    return result
+
+
+def run(models, scales, repeat, index_kinds=None, nprobes=NPROBES, ef_searches=EF_SEARCHES):
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "faiss": faiss.__version__,
+        "models": {},
+    }
+    for model_name in models:
+        load_ms, model = timed_ms(lambda: load_model(model_name))
+        model_result = {"load_ms": load_ms, "corpora": {}, "collections": {}, "heritage_scaled": []}
+
+        # 지식 파일마다 한 번씩 (같은 파일을 쓰는 컬렉션은 한 번만)
+        for spec in COLLECTIONS.values():
+            if spec["format"] == "heritage" or spec["path"] in model_result["corpora"]:
+                continue
+            sentences = [entry["search"] for entry in load_entries(spec["path"], spec["format"])]
+            if sentences:
+                model_result["corpora"][spec["path"]] = bench_corpus(model, sentences, SAMPLE_QUESTIONS, repeat)
+
+        items = load_entries(HERITAGE_FILE, "heritage")
+        heritage_sentences = [heritage_sentence(item) for item in items]
+        model_result["corpora"][HERITAGE_FILE] = bench_corpus(model, heritage_sentences, SAMPLE_QUESTIONS, repeat)
+        model_result["collections"] = bench_answers(model_name, SAMPLE_QUESTIONS, repeat)
+        base_embeddings = np.asarray(model.encode(heritage_sentences, convert_to_numpy=True, normalize_embeddings=True, batch_size=64), dtype=np.float32)
+        for scale in scales:
+            model_result["heritage_scaled"].append(
+                bench_scaled_heritage(model, items, base_embeddings, SAMPLE_QUESTIONS, scale, repeat, index_kinds=index_kinds, nprobes=nprobes, ef_searches=ef_searches)
+            )
+            for row in model_result["heritage_scaled"][-1].get("index_kinds", []):
+                knob = f"nprobe={row['nprobe']}" if "nprobe" in row else f"efSearch={row['ef_search']}" if "ef_search" in row else ""
+                print(
+                    f"  x{scale} {row['kind']:6s} {knob:13s} recall@10 {row['recall_at_10']:.3f} "
+                    f"p50 {row['search']['p50_ms']:.2f}ms build {row['build_ms']:.0f}ms {row['size_mb']:.1f}MB"
+                )
+
+        # 한 프로세스에서 여러 모델을 재면 앞 모델의 메모리도 들어가므로 모델별 값이라고 하지 않음
+        memory_key = "peak_rss_mb" if len(models) == 1 else "process_peak_rss_mb"
+        model_result[memory_key] = peak_rss_mb()
+        results["models"][model_name] = model_result
+        print(f"{model_name}: 로드 {load_ms:.0f}ms, 최대 메모리({memory_key}) {model_result[memory_key]:.0f}MB")
+    return results
+
+
+# 모델마다 따로 프로세스를 띄워 재고 결과 합치기 (peak_rss_mb가 모델별 값이 되도록)
+def run_isolated(models, argv):
+    results = None
+    for model_name in models:
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            subprocess.run([sys.executable, os.path.abspath(__file__), *argv, "--in-process", "--models", model_name, "-o", path], check=True)
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+        finally:
+            os.remove(path)
+        if results is None:
+            results = result
+        else:
+            results["models"].update(result["models"])
+    return results
+
+
+# 이전 결과와 비교: 모델/컬렉션별 실제 답변 지연 시간과 지식 파일별 인코딩+검색 지연 시간(p50, p95) 변화 출력
+def compare(old, new):
+    for model_name, model_result in new["models"].items():
+        old_model = old.get("models", {}).get(model_name)
+        if not old_model:
+            continue
+        for group, metric in (("collections", "end_to_end"), ("corpora", "encode_and_search")):
+            for target, stats in model_result.get(group, {}).items():
+                old_stats = old_model.get(group, {}).get(target, {})
+                if metric not in old_stats:
+                    continue
+                before, after = old_stats[metric], stats[metric]
+                print(
+                    f"{model_name} {target} {metric}: p50 {before['p50_ms']:.1f} -> {after['p50_ms']:.1f}ms, "
+                    f"p95 {before['p95_ms']:.1f} -> {after['p95_ms']:.1f}ms"
+                )
+
+
+# 사용 예: python benchmark.py -o bench.json --models jhgan/ko-sbert-sts --scales 10 100 1000
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="인코딩, 인덱스 구축, 검색, 전체 답변 지연 시간 측정")
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--models", nargs="+", default=MODELS)
+    parser.add_argument("--scales", nargs="+", type=int, default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5, help="질문 목록 반복 횟수")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--index-kinds", nargs="*", default=[], help=f"확대한 문화유산으로 비교할 인덱스 구조 (예: {' '.join(INDEX_KINDS)})")
+    parser.add_argument("--nprobe", nargs="+", type=int, default=NPROBES)
+    parser.add_argument("--ef-search", nargs="+", type=int, default=EF_SEARCHES)
+    parser.add_argument("--in-process", action="store_true", help="모델마다 프로세스를 따로 띄우지 않음 (메모리는 process_peak_rss_mb)")
+    args = parser.parse_args()
+
+    if len(args.models) > 1 and not args.in_process:
+        argv = ["--scales", *map(str, args.scales), "--repeat", str(args.repeat), "--nprobe", *map(str, args.nprobe), "--ef-search", *map(str, args.ef_search)]
+        if args.index_kinds:
+            argv += ["--index-kinds", *args.index_kinds]
+        results = run_isolated(args.models, argv)
+    else:
+        results = run(args.models, args.scales, args.repeat, args.index_kinds, args.nprobe, args.ef_search)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), results)
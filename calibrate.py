@@ -0,0 +1,127 @@
+import argparse
+import json
+from collections import defaultdict
+
+import numpy as np
+
+from batch_ask import load_questions
+from faiss_store import save_calibration
+from retrieval_engine import DEFAULT_MIN_SIMILARITY, EXACT_HIT_SIMILARITY, HeritageCollection, default_threshold, get_engine
+
+# 라벨 붙은 질문 파일: {"collection": 컬렉션, "question": 질문, "answer_id": 정답 문장 번호 (범위 밖 질문은 null)}
+QUESTIONS_FILE = "calibration_questions.jsonl"
+
+
+# 질문마다 (1등 유사도, 1등이 정답인지, 답이 있는 질문인지)
+#   키워드로 바로 찾은 답(EXACT_HIT_SIMILARITY)은 기준값과 상관없이 언제나 보여주므로(accepts) 따로 모음
+#   -> (기준값을 고를 표본, 키워드로 바로 찾은 표본)
+def evaluate(collection, rows):
+    hits = collection.search_batch([row["question"] for row in rows], k=1)
+    positions = {id(entry): i for i, entry in enumerate(collection.entries)}
+    samples, exact_samples = [], []
+    for row, row_hits in zip(rows, hits):
+        answer_id = row.get("answer_id")
+        if not row_hits:
+            samples.append((DEFAULT_MIN_SIMILARITY, False, answer_id is not None))
+            continue
+        score, doc = row_hits[0]
+        # 조각으로 나눈 컬렉션은 조각이 가리키는 원래 문단 번호로 비교
+        predicted = doc["parent"] if "parent" in doc else positions[id(doc)]
+        sample = (score, answer_id is not None and predicted == answer_id, answer_id is not None)
+        (exact_samples if score == EXACT_HIT_SIMILARITY else samples).append(sample)
+    return samples, exact_samples
+
+
+# 기준값 threshold에서의 fallback("잘 이해되지 않아요") 성능
+#   fallback 해야 하는 질문 = 범위 밖 질문 + 1등이 틀린 질문
+def fallback_report(samples, threshold):
+    scores = np.array([s for s, _, _ in samples], dtype=np.float32)
+    correct = np.array([c for _, c, _ in samples], dtype=bool)
+    fallback = scores < threshold
+    should = ~correct
+    true_fallbacks = int(np.sum(fallback & should))
+    return {
+        "threshold": float(threshold),
+        "accuracy": float(np.mean(np.where(fallback, should, correct))),
+        "fallback_precision": true_fallbacks / int(fallback.sum()) if fallback.any() else 1.0,
+        "fallback_recall": true_fallbacks / int(should.sum()) if should.any() else 1.0,
+        "answered_wrong": int(np.sum(~fallback & should)),
+    }
+
+
+# 정확도(맞는 답을 보여주거나, 틀릴 답 대신 fallback)가 가장 높은 기준값, 같으면 더 많이 답하는 낮은 값
+#   기준값은 이웃한 두 점수의 가운데로 잡아 새 질문에 조금 더 여유를 둠
+def choose_threshold(samples):
+    scores = sorted({s for s, _, _ in samples})
+    candidates = [DEFAULT_MIN_SIMILARITY] + [(a + b) / 2 for a, b in zip(scores, scores[1:])] + [scores[-1] + 1e-6]
+    best = None
+    for threshold in candidates:
+        report = fallback_report(samples, threshold)
+        if best is None or report["accuracy"] > best["accuracy"]:
+            best = report
+    return best
+
+
+def calibrate(engine, rows, save=True):
+    by_collection = defaultdict(list)
+    for row in rows:
+        by_collection[engine.resolve(row["collection"])].append(row)
+
+    reports = {}
+    for name, collection_rows in by_collection.items():
+        collection = engine.collection(name)
+        if isinstance(collection, HeritageCollection):
+            print(f"{name}: 문화유산은 조건 필터로 답을 고르므로 보정하지 않습니다")
+            continue
+        samples, exact_samples = evaluate(collection, collection_rows)
+        if not samples:
+            print(f"{name}: 모든 질문이 키워드로 바로 답해져서 기준값을 고를 질문이 없습니다")
+            continue
+        report = {
+            "collection": name,
+            "model": collection.model_id,
+            "questions": len(samples),
+            "out_of_scope": sum(1 for _, _, answerable in samples if not answerable),
+            # 기준값과 상관없이 답하는 질문 (정확도 계산에서 빠짐)
+            "exact_hits": len(exact_samples),
+            "exact_hits_correct": sum(1 for _, correct, _ in exact_samples if correct),
+            **choose_threshold(samples),
+            "without_threshold": fallback_report(samples, DEFAULT_MIN_SIMILARITY),
+            "default_threshold": fallback_report(samples, default_threshold(collection.model_name)),
+        }
+        if save:
+            report["path"] = save_calibration(collection.model_id, [doc["search"] for doc in collection.docs], report)
+            collection.calibration = report
+            collection.threshold = report["threshold"]
+        reports[name] = report
+        print(
+            f"{name} ({collection.model_id}): 기준 유사도 {report['threshold']:.3f}, 정확도 {report['accuracy']:.1%} "
+            f"(기준값 없이 {report['without_threshold']['accuracy']:.1%}, 모델 기본값 {report['default_threshold']['accuracy']:.1%}), "
+            f"fallback 정밀도 {report['fallback_precision']:.1%} / 재현율 {report['fallback_recall']:.1%}, "
+            f"키워드 바로 찾기 {report['exact_hits_correct']}/{report['exact_hits']}개 정답"
+        )
+    return reports
+
+
+# 사용 예: python calibrate.py                       -> 모든 컬렉션 보정 후 인덱스 옆(.index_cache)에 저장
+#          python calibrate.py my_questions.jsonl --no-save -o report.json
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="라벨 붙은 질문으로 컬렉션/모델별 유사도 기준값 보정")
+    parser.add_argument("questions", nargs="?", default=QUESTIONS_FILE, help="라벨 붙은 질문 파일 (.jsonl 또는 .csv)")
+    parser.add_argument("--collections", nargs="*", help="이 컬렉션만 보정")
+    parser.add_argument("--no-save", action="store_true", help="보고만 하고 기준값은 저장하지 않음")
+    parser.add_argument("-o", "--output", help="보고서 JSON 파일")
+    args = parser.parse_args()
+
+    rows = load_questions(args.questions)
+    for row in rows:
+        # CSV에서는 answer_id가 글자로 들어옴 (빈 칸 = 범위 밖 질문)
+        if isinstance(row.get("answer_id"), str):
+            row["answer_id"] = int(row["answer_id"]) if row["answer_id"].strip() else None
+    if args.collections:
+        rows = [row for row in rows if row["collection"] in args.collections]
+
+    reports = calibrate(get_engine(), rows, save=not args.no_save)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,77 @@
+import streamlit as st
+from lazy_loader import LOADER, show_status
+from retrieval_engine import get_engine
+from query_cache import QUERY_CACHE
+from reranker import get_reranker
+from history_store import session_history, show_history
+from streaming import stream_answer
+from tracing import request
+
+# 한 프로세스에서 모든 지식 컬렉션을 제공하는 통합 챗봇
+st.set_page_config(page_title="AI챗봇")
+st.title("🌱 구포초등학교 AI챗봇 모음")
+
+COLLECTION_LABELS = {
+    "energy2": "재생에너지2 (물 사용량, 온실가스)",
+    "energy3": "재생에너지3 (쓰레기, 냉방기기, 에너지 소비)",
+    "busan": "부산 지리정보",
+    "jeju_busan": "부산&제주 지리정보",
+    "jeju_busan2": "부산&제주 지리정보 (계절 포함)",
+    "population_busan": "인구, 면적",
+    "knowledge": "부산 기온, 강수량",
+    "knowledge_kykim": "부산 기온, 강수량 (kykim)",
+    "total": "부산&제주 면적, 인구, 기온",
+    "heritage": "부산 문화유산",
+}
+
+engine = get_engine()
+
+history = session_history(st, "chatbot_app")
+
+name = st.selectbox("어떤 챗봇과 이야기할까요?", engine.names(), format_func=lambda n: COLLECTION_LABELS.get(n, n))
+# 고른 챗봇부터 백그라운드에서 불러오고, 나머지도 차례로 준비
+LOADER.start([name])
+LOADER.start(engine.names())
+show_status(st, name)
+user_input = st.text_input("무엇이 궁금한가요?")
+
+col1, col2 = st.columns([1, 1])
+with col1:
+    질문하기 = st.button("질문하기")
+with col2:
+    if st.button("초기화"):
+        history.clear()
+        st.success("기록이 초기화되었습니다!")
+
+if 질문하기 and user_input:
+    with request("page", collection=name):
+        # 규칙 답변이나 키워드 후보를 먼저 보여주고, 의미 검색이 끝나면 그 답으로 바꿔 그림
+        matched_answer = stream_answer(st.empty(), name, user_input, unsafe_allow_html=True)["answer"]
+        history.append(user_input, matched_answer)
+
+# 캐시 적중률 (캐시 크기 조정용)
+stats = QUERY_CACHE.stats()
+st.sidebar.caption(
+    f"질문 캐시 {stats['size']}/{stats['max_size']} · "
+    f"벡터 적중 {stats['vector_hits']}/{stats['vector_hits'] + stats['vector_misses']} · "
+    f"답변 적중 {stats['answer_hits']}/{stats['answer_hits'] + stats['answer_misses']}"
+)
+
+# 재정렬 지연 시간과 시간 초과/앞 계산 대기로 1단계 순서를 쓴 수
+reranker = get_reranker()
+if reranker is not None:
+    rerank_stats = reranker.stats()
+    st.sidebar.caption(
+        f"재정렬 {rerank_stats['reranker']} · p95 {rerank_stats['p95_ms']:.1f}ms / {rerank_stats['budget_ms']:.0f}ms · "
+        f"시간 초과 {rerank_stats['timeouts']}/{rerank_stats['calls']} · 건너뜀 {rerank_stats['busy']}"
+    )
+
+# 준비 상태와 단계별 로딩 시간 (import / 모델 / 인덱스 / 예열)
+loader_status = LOADER.status()
+st.sidebar.caption(f"준비 완료 {len(loader_status['ready'])}/{len(engine.names())}")
+with st.sidebar.expander("로딩 시간"):
+    for stage, ms in loader_status["timings_ms"].items():
+        st.text(f"{stage}: {ms:.0f} ms")
+
+# 이전 질문 기록
+show_history(st, history, unsafe_allow_html=True)
@@ -0,0 +1,79 @@
+import re
+import sys
+
+# 문장 끝 (마침표/물음표/느낌표 뒤 공백)에서 나누기. 소수점(37.5)은 뒤에 공백이 없어 나뉘지 않음
+_sentence_end = re.compile(r"(?<=[.!?])\s+")
+# 숫자가 들어 있는 단어 (연도, 수치)
+_number = re.compile(r"\d")
+# 연도가 아닌 수치 (수치가 없는 문장은 "부산의 2025년 구군별 인구수를 알려드립니다."처럼 주제 문장)
+_quantity = re.compile(r"\d+(?:\.\d+)?(?![\d.]*년)")
+# 이 개수 이상 쉼표로 이어진 문장은 목록으로 보고 항목마다 조각으로 나눔
+MIN_LIST_ITEMS = 4
+# 주제어로 볼 조사 ("보급률은 1993년에 6%, ..." 에서 "보급률은")
+TOPIC_PARTICLES = ("은", "는", "이", "가")
+
+
+def split_sentences(text):
+    return [s.strip() for s in _sentence_end.split(text.strip()) if s.strip()]
+
+
+# 목록 문장의 첫 항목에서 숫자 앞부분 (예: "우리나라 냉방기기 에어컨 보급률은")
+#   "해운대구 인구 37.5만 명"처럼 항목 이름이면 다른 항목에 붙이지 않도록 조사로 끝날 때만 사용
+def list_lead(first_item):
+    lead = []
+    for word in first_item.split():
+        if _number.search(word):
+            break
+        lead.append(word)
+    if lead and lead[-1].endswith(TOPIC_PARTICLES):
+        return " ".join(lead)
+    return ""
+
+
+# 긴 문단 하나 -> 조각 목록 (문장 단위, 목록 문장은 항목 단위)
+#   수치가 없는 문장은 주제 문장으로 보고 뒤따르는 조각 앞에 붙여 문맥을 유지 (이어진 주제 문장은 합침)
+def chunk_paragraph(text):
+    chunks = []
+    topic = ""
+    after_topic = False
+    for sentence in split_sentences(text):
+        if not _quantity.search(sentence):
+            if after_topic:
+                topic = f"{topic} {sentence}"
+                chunks[-1] = topic
+            else:
+                topic = sentence
+                chunks.append(topic)
+            after_topic = True
+            continue
+        after_topic = False
+        items = [item.strip() for item in sentence.split(",") if item.strip()]
+        if len(items) < MIN_LIST_ITEMS:
+            chunks.append(f"{topic} {sentence}".strip())
+            continue
+        lead = list_lead(items[0])
+        for i, item in enumerate(items):
+            prefix = f"{lead} " if lead and i > 0 else ""
+            chunks.append(f"{topic} {prefix}{item}".strip())
+    return chunks or [text.strip()]
+
+
+# 항목 목록 -> 조각 목록 [{"search", "full", "parent": 원래 항목 번호}]
+#   조각이 하나뿐인 항목은 원래 항목 그대로 사용
+def chunk_entries(entries):
+    chunks = []
+    for parent, entry in enumerate(entries):
+        pieces = chunk_paragraph(entry["full"])
+        if len(pieces) == 1:
+            chunks.append({"search": entry["search"], "full": entry["full"], "parent": parent})
+            continue
+        chunks.extend({"search": piece, "full": piece, "parent": parent} for piece in pieces)
+    return chunks
+
+
+# 사용 예: python chunking.py energy3.txt  -> 조각 나누기 결과 확인
+if __name__ == "__main__":
+    from retrieval_engine import load_entries
+
+    for chunk in chunk_entries(load_entries(sys.argv[1], "lines")):
+        print(f"[{chunk['parent']}] {chunk['search']}")
@@ -0,0 +1,311 @@
+import json
+import os
+import re
+import sys
+from collections import namedtuple
+
+from lexical_index import words
+
+# 수치 사실 한 줄: (대상, 항목, 연도, 값, 단위, 원래 글) + 어느 표(문단)에서 나왔는지
+Fact = namedtuple("Fact", "entity metric year value unit text table")
+
+# 연도("2019년", "2016년도")나 "1인당", "1위" 같은 말이 아닌 수치와 뒤따르는 만/억 단위
+_value = re.compile(r"(?<![\d.])(\d+(?:\.\d+)?)\s*(천|만|억)?(?![\d.]*\s*(?:년|인당|위|월|일))")
+# "158만 5597명"처럼 만 단위 뒤에 이어 붙은 나머지 수
+_remainder = re.compile(r"\s*(\d{1,4})(?![\d.])(?!\s*(?:년|인당|위|월|일))")
+_year = re.compile(r"(\d{4})\s*년")
+# 기간 ("1993~2016년", "1993년부터 2016년도까지") -> 시작 연도, 끝 연도
+_year_range = re.compile(r"(\d{4})\s*(?:년\s*)?(?:~|-|부터\s*)\s*(\d{4})\s*년")
+MULTIPLIERS = {None: 1, "천": 1e3, "만": 1e4, "억": 1e8}
+# 같은 양을 다른 단위로 적은 표끼리 값을 비교할 수 있도록 기준 단위 값으로 바꾸는 배수
+UNIT_SCALES = {"㎢": 1e6, "제곱킬로미터": 1e6, "제곱미터": 1, "㎡": 1}
+# 대상 이름으로 보지 않는 단어 (합계를 나타내는 말이 붙은 수치는 대상 종류 비교에서 뺌)
+STOP_WORDS = ("총", "약", "모두", "합계", "전체", "이후", "한편", "단위는")
+TOTAL_WORDS = ("총", "합계", "전체")
+# 질문에서 가장 큰 값/작은 값/순서를 묻는 말
+SUPERLATIVE_WORDS = ("가장", "제일", "최고", "최대", "최소", "최저", "1위")
+# 크기를 묻는 말 -> 답변에 쓸 말 (앞쪽이 큰 값, 뒤쪽이 작은 값)
+MAX_WORDS = {"많": "많은", "큰": "큰", "크": "큰", "높": "높은", "넓": "넓은", "길": "긴", "최고": "높은", "최대": "큰"}
+MIN_WORDS = {"적": "적은", "작": "작은", "낮": "낮은", "좁": "좁은", "짧": "짧은", "최소": "작은", "최저": "낮은"}
+RANKING_WORDS = ("순위", "순서", "비교", "차례")
+# 대상 이름 뒤에서 뗄 조사 ("도", "로"는 "경기도", "종로"처럼 이름 끝과 겹쳐서 빼 둠)
+PARTICLES = ("에서는", "에서", "은", "는", "이", "가", "을", "를", "의", "에", "와", "과", "별")
+
+
+def strip_suffix(word):
+    for suffix in PARTICLES:
+        if word.endswith(suffix) and len(word) > len(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def format_value(number, multiplier, unit):
+    return f"{number}{multiplier or ''}{' ' if len(unit) > 1 else ''}{unit}"
+
+
+# 표 설정 하나(지식 문단 하나)에서 사실 뽑기
+#   table: {"entry": 문단 번호, "metric": 항목, "unit": 단위, "type": 대상 종류, "year": 기본 연도,
+#           "entities": 대상 목록 (있으면 문단에서 마지막으로 나온 대상, 없으면 수치 바로 앞 단어),
+#           "after": 이 말 뒤의 수치만 뽑음 ("총 인구수": 남자/여자 인구는 빼고 합계만)}
+#   글을 쉼표/문장 단위로 나눠 앞에서부터 읽으며 마지막으로 나온 연도와 대상을 수치에 붙임
+#   기간이 나오면 뒤따르는 수치를 시작 연도, 끝 연도 차례로 붙임 (수치가 하나뿐이면 기간 전체의 값이라 두 연도 모두)
+#   값(value)은 기준 단위로 바꾼 값이라 단위가 다른 표끼리도 크기를 비교할 수 있음 (글(text)은 원래 단위 그대로)
+def extract_table(text, table, metric_words=()):
+    entities = sorted(table.get("entities", []), key=len, reverse=True)
+    entity_pattern = re.compile("|".join(map(re.escape, entities))) if entities else None
+    unit = table.get("unit", "")
+    scale = UNIT_SCALES.get(unit, 1)
+    facts = []
+    current = table.get("entity")
+    after = table.get("after")
+    if after and after in text:
+        head, _, text = text.partition(after)
+        if entity_pattern is not None:
+            current = (entity_pattern.findall(head) or [current])[-1]
+    for segment in re.split(r"(?<=[.!?])\s+|,", text):
+        year = None
+        span_years = []
+        position = 0
+        for match in _value.finditer(segment):
+            if match.start() < position:
+                continue
+            before = segment[position:match.start()]
+            total = False
+            ranges = list(_year_range.finditer(before))
+            years = _year.findall(before[ranges[-1].end():] if ranges else before)
+            if years:
+                year = int(years[-1])
+                span_years = []
+            elif ranges:
+                span_years = [int(ranges[-1].group(1)), int(ranges[-1].group(2))]
+                year = span_years.pop(0)
+            elif span_years:
+                year = span_years.pop(0)
+            if entity_pattern is not None:
+                mentioned = entity_pattern.findall(before)
+                if mentioned:
+                    current = mentioned[-1]
+                entity = current
+            else:
+                entity = None
+                for word in reversed(before.split()):
+                    word = strip_suffix(word.strip("()"))
+                    if _year.search(word) or any(c.isdigit() for c in word):
+                        break
+                    total = total or word in TOTAL_WORDS
+                    if word in STOP_WORDS or any(word.startswith(m) for m in metric_words):
+                        continue
+                    entity = word
+                    break
+                entity = entity or current
+            number, multiplier = match.group(1), match.group(2)
+            value = float(number) * MULTIPLIERS[multiplier]
+            written = format_value(number, multiplier, unit)
+            position = match.end()
+            rest = _remainder.match(segment, position) if multiplier == "만" else None
+            if rest is not None:
+                value += int(rest.group(1))
+                written = format_value(f"{number}만 {rest.group(1)}", None, unit)
+                position = rest.end()
+            if entity is None:
+                continue
+            fact = Fact(
+                entity=entity,
+                metric=table["metric"],
+                year=year if year is not None else table.get("year"),
+                value=value * scale,
+                unit=unit,
+                text=written,
+                table=None if total else table.get("type"),
+            )
+            facts.append(fact)
+            # 기간 뒤에 수치가 하나뿐이면 끝 연도에도 같은 값
+            if span_years and not _value.search(segment, match.end()):
+                facts.append(fact._replace(year=span_years.pop(0)))
+        # 수치 없이 대상만 나온 문장 ("인천의 하루 평균 음식물 쓰레기 배출량이다.")
+        if entity_pattern is not None:
+            mentioned = entity_pattern.findall(segment[position:])
+            if mentioned:
+                current = mentioned[-1]
+    return facts
+
+
+# 수치 사실 표: 대상/항목별 색인으로 찾기와 정렬로 답함 (모델 없이)
+#   facts 파일: {"metrics": {항목: [질문에서 찾을 말]}, "types": {대상 종류: [질문에서 찾을 말]}, "tables": [...]}
+class FactStore:
+    def __init__(self, facts, metrics=None, types=None, source="사실", checks=()):
+        self.source = source
+        # 확인용 질문: [{"question": 질문, "expect": 답에 들어 있어야 할 글}] (python fact_store.py --check)
+        self.checks = list(checks)
+        self.facts = list(facts)
+        self.metrics = metrics or {}
+        self.types = types or {}
+        self.by_entity = {}
+        self.by_metric = {}
+        # 합계 문장에서 뽑은 수치는 같은 대상/항목/연도의 수치가 다른 표에 있으면 뺌
+        #   ("부산 총 면적은 77001만 제곱미터" 와 "부산 771㎢"를 한 답에 함께 내지 않도록)
+        typed = {(f.entity, f.metric, f.year) for f in self.facts if f.table is not None}
+        self.facts = [f for f in self.facts if f.table is not None or (f.entity, f.metric, f.year) not in typed]
+        for i, fact in enumerate(self.facts):
+            self.by_entity.setdefault(fact.entity, []).append(i)
+            self.by_metric.setdefault(fact.metric, []).append(i)
+        for metric in self.by_metric:
+            self.metrics.setdefault(metric, [metric])
+        # 긴 이름 먼저 ("해운대구" 안의 "대구"는 따로 찾지 않도록)
+        self._entities = sorted(self.by_entity, key=len, reverse=True)
+
+    # 질문에 나온 대상 (더 긴 이름에 들어 있는 짧은 이름은 뺌)
+    def find_entities(self, question):
+        matched = [e for e in self._entities if e in question]
+        return [e for e in matched if not any(e != other and e in other for other in matched)]
+
+    def find_metrics(self, question):
+        return [metric for metric, aliases in self.metrics.items() if any(alias in question for alias in aliases)]
+
+    def find_type(self, question):
+        question_words = [strip_suffix(w) for w in words(question)]
+        for type_name, aliases in self.types.items():
+            if any(w in aliases for w in question_words):
+                return type_name
+        return None
+
+    # 질문 -> 답변 글 (사실 표로 답할 수 없으면 None)
+    def answer(self, question):
+        metrics = self.find_metrics(question)
+        if not metrics:
+            return None
+        metric = metrics[0]
+        rows = [self.facts[i] for i in self.by_metric[metric]]
+        years = [int(y) for y in _year.findall(question)]
+        if years:
+            rows = [f for f in rows if f.year in years]
+        entities = self.find_entities(question)
+        if entities:
+            rows = [f for f in rows if f.entity in entities]
+        type_name = self.find_type(question)
+        if type_name and not entities:
+            rows = [f for f in rows if f.table == type_name]
+        if not rows:
+            return None
+        # 대상이 하나뿐인 표("대한민국 1인당 에너지 소비량")는 대상을 묻지 않아도 됨
+        if not entities and len({f.entity for f in rows}) == 1:
+            entities = [rows[0].entity]
+
+        superlative = any(w in question for w in SUPERLATIVE_WORDS)
+        # 대상 하나의 여러 해 값 중 가장 큰/작은 해 ("1인당 에너지 소비량이 가장 많은 해")
+        if superlative and len(entities) == 1 and len({f.year for f in rows if f.year is not None}) > 1:
+            direction = self.direction(question, entities)
+            rows = sorted((f for f in rows if f.year is not None), key=lambda f: f.value, reverse=direction not in MIN_WORDS.values())
+            best = rows[0]
+            return f"{best.entity} {metric}{josa(metric, '이', '가')} 가장 {direction} 해는 {best.year}년({best.text})입니다."
+        # 대상을 하나만 물으면 순위를 매기지 않고 그 대상의 값으로 답함 ("울산 인구 순위")
+        if (superlative or any(w in question for w in RANKING_WORDS)) and len(entities) != 1:
+            if not entities:
+                # 한 종류(표) 안에서만 순위를 매김: 질문에 종류가 없으면 남은 수치가 모두 같은 종류일 때만
+                #   ("인구 순위"는 시도와 구군이 섞이므로 답하지 않음, 합계 수치는 비교에서 뺌)
+                types = {f.table for f in rows}
+                if len(types) > 1:
+                    types.discard(None)
+                if len(types) != 1:
+                    return None
+                rows = [f for f in rows if f.table in types]
+            if not years:
+                # 연도가 여러 개면 가장 최근 값끼리 비교 (대상을 물었으면 대상마다 가장 최근 값)
+                latest = {}
+                for f in rows:
+                    key = f.entity if entities else None
+                    if f.year is not None and f.year > latest.get(key, f.year - 1):
+                        latest[key] = f.year
+                rows = [f for f in rows if f.year == latest.get(f.entity if entities else None)]
+            if not rows:
+                return None
+            direction = self.direction(question, entities)
+            descending = direction not in MIN_WORDS.values()
+            rows = sorted(rows, key=lambda f: f.value, reverse=descending)
+            if superlative:
+                best = rows[0]
+                what = type_name or "곳"
+                label = f"{best.year}년 {best.entity}" if len({f.year for f in rows}) > 1 else best.entity
+                return f"{metric}{josa(metric, '이', '가')} 가장 {direction} {what}{josa(what, '은', '는')} {label}({best.text})입니다."
+            return ", ".join(f"{i}. {describe(f, entities)}" for i, f in enumerate(rows, 1))
+
+        if not entities:
+            return None
+        if len(rows) == 1:
+            fact = rows[0]
+            year = f"{fact.year}년 " if fact.year is not None else ""
+            return f"{year}{fact.entity} {metric}{josa(metric, '은', '는')} {fact.text}입니다."
+        return f"{' '.join(entities)} {metric}: " + ", ".join(describe(f, entities) for f in rows)
+
+    # 큰 값/작은 값 중 무엇을 묻는지 (항목/대상 이름 안의 글자는 보지 않음: "면적"의 "적")
+    #   한 글자 별칭("넓")은 크기를 묻는 말이기도 하므로 지우지 않음
+    def direction(self, question, entities):
+        names = entities + list(self.metrics) + [alias for aliases in self.metrics.values() for alias in aliases]
+        for name in sorted(names, key=len, reverse=True):
+            if len(name) > 1:
+                question = question.replace(name, " ")
+        found = [(question.find(w), label) for w, label in {**MAX_WORDS, **MIN_WORDS}.items() if w in question]
+        return min(found)[1] if found else MAX_WORDS["많"]
+
+
+# 받침에 맞는 조사 ("인구가" / "면적이")
+def josa(word, with_final, without_final):
+    last = word[-1] if word else ""
+    if "가" <= last <= "힣" and (ord(last) - ord("가")) % 28 != 0:
+        return with_final
+    return without_final
+
+
+def describe(fact, entities):
+    parts = []
+    if fact.year is not None:
+        parts.append(f"{fact.year}년")
+    if len(entities) != 1:
+        parts.append(fact.entity)
+    return f"{' '.join(parts)} {fact.text}".strip()
+
+
+def load_facts(path, entries):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    metrics = {metric: list(aliases) for metric, aliases in data.get("metrics", {}).items()}
+    metric_words = sorted({w for aliases in metrics.values() for w in aliases} | {t["metric"] for t in data["tables"]})
+    facts = []
+    for table in data["tables"]:
+        if not 0 <= table["entry"] < len(entries):
+            raise ValueError(f"{os.path.basename(path)}: 문단 번호 {table['entry']}가 지식 파일 범위를 벗어났습니다")
+        facts.extend(extract_table(entries[table["entry"]]["full"], table, metric_words))
+    return FactStore(facts, metrics, data.get("types"), source=os.path.basename(path), checks=data.get("checks", ()))
+
+
+# 사실 파일의 확인용 질문을 실제 라우팅(engine.route, 규칙 포함)으로 답해 보고 틀린 수 돌려주기
+def run_checks(engine, names):
+    failed = 0
+    for name in names:
+        store = engine.facts(name)
+        for check in store.checks if store is not None else ():
+            answer = engine.route(name, check["question"]).get("answer")
+            ok = answer is not None and check["expect"] in answer
+            failed += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}: {check['question']} -> {answer}")
+    return failed
+
+
+# 사용 예: python fact_store.py population_busan                 -> 뽑은 사실 표 보기
+#          python fact_store.py population_busan "해운대구 인구"  -> 사실 표로 답하기
+#          python fact_store.py --check                          -> 사실 파일의 확인용 질문 검사
+if __name__ == "__main__":
+    from retrieval_engine import get_engine
+
+    if sys.argv[1] == "--check":
+        engine = get_engine()
+        sys.exit(1 if run_checks(engine, sys.argv[2:] or engine.names()) else 0)
+    store = get_engine().facts(sys.argv[1])
+    if store is None:
+        print(f"{sys.argv[1]}: 사실 파일이 없습니다")
+        sys.exit(1)
+    if len(sys.argv) == 2:
+        for fact in store.facts:
+            print(f"{fact.table or '-':6s} {fact.entity:10s} {fact.metric:12s} {fact.year or '-':>6} {fact.value:>16,.1f} {fact.text}")
+    for question in sys.argv[2:]:
+        print(f"{question} -> {store.answer(question)}")
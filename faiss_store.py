@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from tracing import span
+from vector_cache import entry_ids, get_vector_cache
+
+# FAISS 인덱스 저장 폴더
+INDEX_DIR = ".index_cache"
+# 인덱스 종류: 정규화한 임베딩의 내적(= 코사인 유사도, 클수록 가까움)
+METRIC = "ip"
+
+# 인덱스 구조: auto면 문장 수로 고름 (flat / hnsw / ivf / ivfpq)
+INDEX_KINDS = ("auto", "flat", "hnsw", "ivf", "ivfpq")
+INDEX_KIND = os.environ.get("EDU_CHATBOT_INDEX_KIND", "auto")
+# auto 기준: 이보다 작으면 해당 구조 사용
+FLAT_MAX = 20_000
+HNSW_MAX = 200_000
+IVF_FLAT_MAX = 1_000_000
+# 정확도/속도 조절: IVF는 살펴볼 목록 수(nprobe), HNSW는 탐색 폭(efSearch). 클수록 정확하지만 느림
+NPROBE = int(os.environ.get("EDU_CHATBOT_NPROBE", "16"))
+EF_SEARCH = int(os.environ.get("EDU_CHATBOT_EF_SEARCH", "64"))
+HNSW_M = 32
+# IVF 학습에 쓰는 표본 수 (목록 하나당 이 정도면 충분)
+TRAIN_PER_LIST = 64
+
+
+# 문장 수에 맞는 인덱스 구조
+def choose_kind(size, kind=None):
+    kind = kind or INDEX_KIND
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"알 수 없는 인덱스 종류입니다: {kind} ({', '.join(INDEX_KINDS)})")
+    if kind != "auto":
+        return kind
+    if size < FLAT_MAX:
+        return "flat"
+    if size < HNSW_MAX:
+        return "hnsw"
+    return "ivf" if size < IVF_FLAT_MAX else "ivfpq"
+
+
+# 지식 문장 내용 + 모델 이름으로 캐시 키 만들기 (지식 파일이 바뀌면 키도 바뀜)
+def content_key(sentences, model_name, kind="flat"):
+    h = hashlib.sha256()
+    # idmap: 문장 내용으로 만든 고정 번호로 저장 (문장을 더하거나 지울 때 그 문장만 고침)
+    h.update(f"{model_name}|{METRIC}|idmap".encode("utf-8"))
+    # flat은 예전 키와 같게 두고, 다른 구조만 키에 넣음
+    if kind != "flat":
+        h.update(f"|{kind}".encode("utf-8"))
+    for sentence in sentences:
+        h.update(b"\0")
+        h.update(sentence.encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+# IVF 목록 수: 대략 4 * sqrt(문장 수)
+def ivf_lists(size):
+    return max(1, min(int(4 * np.sqrt(size)), size // 39 or 1))
+
+
+# PQ 조각 수: 조각 하나가 8차원 정도 되도록 (차원을 나누어떨어지게)
+def pq_subquantizers(dim):
+    m = max(1, dim // 8)
+    while dim % m:
+        m -= 1
+    return m
+
+
+# 임베딩 행렬로 인덱스 만들기 (IVF 계열은 무작위 표본으로 먼저 학습)
+#   ids를 주면 그 번호로 넣음 (나중에 번호로 지우고 더할 수 있음)
+#   IVF는 번호를 직접 저장하고, flat/HNSW는 IndexIDMap2로 감쌈
+def build_index(embeddings, kind=None, seed=0, ids=None):
+    import faiss
+
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    size, dim = embeddings.shape
+    kind = choose_kind(size, kind)
+    if kind == "flat":
+        index = faiss.IndexFlatIP(dim)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    else:
+        nlist = ivf_lists(size)
+        quantizer = faiss.IndexFlatIP(dim)
+        if kind == "ivf":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_subquantizers(dim), 8, faiss.METRIC_INNER_PRODUCT)
+        sample_size = min(size, max(nlist * TRAIN_PER_LIST, 256 if kind == "ivfpq" else nlist))
+        sample = embeddings[np.random.default_rng(seed).choice(size, sample_size, replace=False)]
+        index.train(sample)
+    if ids is None:
+        index.add(embeddings)
+    else:
+        if kind in ("flat", "hnsw"):
+            index = faiss.IndexIDMap2(index)
+        index.add_with_ids(embeddings, np.asarray(ids, dtype=np.int64))
+    return prepare_index(index)
+
+
+# IndexIDMap 안쪽의 실제 인덱스
+def base_index(index):
+    import faiss
+
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def index_kind(index):
+    import faiss
+
+    if isinstance(base_index(index), faiss.IndexHNSW):
+        return "hnsw"
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is None:
+        return "flat"
+    return "ivfpq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf"
+
+
+# 정확도/속도 조절값 적용 (읽어 온 인덱스에도 다시 적용해야 함)
+#   IVF는 일부 항목만 꺼내 보고 지울 수도 있도록 번호 -> 위치 표(direct map, 해시 테이블)도 만들어 둠
+def prepare_index(index, nprobe=None, ef_search=None):
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type != faiss.DirectMap.Hashtable:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    return set_search_knobs(index, nprobe, ef_search)
+
+
+def set_search_knobs(index, nprobe=None, ef_search=None):
+    import faiss
+
+    hnsw = base_index(index)
+    if isinstance(hnsw, faiss.IndexHNSW):
+        hnsw.hnsw.efSearch = ef_search or EF_SEARCH
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe or NPROBE, ivf.nlist)
+    return index
+
+
+# 일부 항목(ids) 안에서만 검색 -> (유사도 행렬, 번호 행렬) (index.search와 같은 모양)
+#   flat은 IDSelector로 걸러서 검색, 근사 인덱스는 고른 항목을 놓치지 않도록 그 벡터만 꺼내 직접 계산
+def search_subset(index, query_vecs, ids, k):
+    import faiss
+
+    ids = np.asarray(ids, dtype=np.int64)
+    if index_kind(index) == "flat":
+        return index.search(query_vecs, k, params=faiss.SearchParameters(sel=faiss.IDSelectorBatch(ids)))
+    scores = query_vecs @ index.reconstruct_batch(ids).T
+    top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(scores, top, axis=1), ids[top]
+
+
+# 저장된 인덱스 읽기 (가능하면 메모리 매핑)
+def read_index(index_path):
+    import faiss
+
+    try:
+        index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+    except RuntimeError:
+        index = faiss.read_index(index_path)
+    return prepare_index(index)
+
+
+def index_paths(sentences, model_name, kind, index_dir=INDEX_DIR):
+    key = content_key(sentences, model_name, kind)
+    return os.path.join(index_dir, f"{key}.faiss"), os.path.join(index_dir, f"{key}.json")
+
+
+def read_cached_index(index_path, sentences_path):
+    if os.path.exists(index_path) and os.path.exists(sentences_path):
+        with open(sentences_path, "r", encoding="utf-8") as f:
+            return read_index(index_path), json.load(f)
+    return None
+
+
+# 임시 파일에 쓴 뒤 교체해서 다른 프로세스가 반쯤 쓴 파일을 읽지 않게 함
+def write_cached_index(index, sentences, index_path, sentences_path):
+    import faiss
+
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    faiss.write_index(index, index_path + ".tmp")
+    with open(sentences_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(list(sentences), f, ensure_ascii=False)
+    os.replace(sentences_path + ".tmp", sentences_path)
+    os.replace(index_path + ".tmp", index_path)
+
+
+# 문장 임베딩 행렬 (문장별 캐시에 없는 문장만 인코딩)
+#   corpus(컬렉션 이름)와 그 전체 문장을 알려 주면 캐시가 쓰지 않게 된 예전 벡터를 버림
+def sentence_vectors(model, model_name, sentences, corpus=None, corpus_sentences=None):
+    if not sentences:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+    with span("encode_corpus"):
+        vectors, _ = get_vector_cache(model_name).vectors(model, sentences, corpus=corpus, corpus_sentences=corpus_sentences)
+    return vectors
+
+
+# 저장된 인덱스가 있으면 불러오고, 없으면 문장별 캐시로 임베딩을 모아 만들어 저장
+#   인덱스 번호는 entry_ids(sentences) (문장 내용으로 만든 고정 번호)
+def load_or_build_index(model, model_name, sentences, index_dir=INDEX_DIR, kind=None, corpus=None):
+    kind = choose_kind(len(sentences), kind)
+    index_path, sentences_path = index_paths(sentences, model_name, kind, index_dir)
+    cached = read_cached_index(index_path, sentences_path)
+    if cached is not None:
+        return cached
+
+    vectors = sentence_vectors(model, model_name, sentences, corpus)
+    with span("build_index"):
+        index = build_index(vectors, kind, ids=entry_ids(sentences))
+    write_cached_index(index, sentences, index_path, sentences_path)
+    return index, list(sentences)
+
+
+# 지식 파일이 바뀌었을 때: 기존 인덱스를 복사해 지운 문장은 번호로 빼고 새 문장만 인코딩해서 더함
+#   (검색 중인 요청은 예전 인덱스를 그대로 씀) HNSW는 지울 수 없고, 구조가 바뀌면 캐시된 벡터로 다시 만듦
+def update_index(index, old_sentences, model, model_name, sentences, index_dir=INDEX_DIR, kind=None, corpus=None):
+    import faiss
+
+    kind = choose_kind(len(sentences), kind)
+    index_path, sentences_path = index_paths(sentences, model_name, kind, index_dir)
+    cached = read_cached_index(index_path, sentences_path)
+    if cached is not None:
+        return cached
+    if kind == "hnsw" or index_kind(index) != kind:
+        return load_or_build_index(model, model_name, sentences, index_dir, kind, corpus)
+
+    old_ids = entry_ids(old_sentences)
+    new_ids = entry_ids(sentences)
+    removed = np.setdiff1d(old_ids, new_ids)
+    added = ~np.isin(new_ids, old_ids)
+
+    index = prepare_index(faiss.clone_index(index))
+    if len(removed):
+        # IVF의 해시 테이블 direct map은 IDSelectorArray로만 지울 수 있음
+        index.remove_ids(faiss.IDSelectorArray(removed))
+    if added.any():
+        vectors = sentence_vectors(model, model_name, [s for s, new in zip(sentences, added) if new], corpus, sentences)
+        index.add_with_ids(vectors, new_ids[added])
+    write_cached_index(index, sentences, index_path, sentences_path)
+    return index, list(sentences)
+
+
+# 보정 결과(calibrate.py)는 인덱스 옆에 저장: 지식 문장이나 모델이 바뀌면 키가 바뀌어 다시 보정해야 함
+def calibration_path(model_name, sentences, index_dir=INDEX_DIR):
+    return os.path.join(index_dir, f"{content_key(sentences, model_name)}.calibration.json")
+
+
+def load_calibration(model_name, sentences, index_dir=INDEX_DIR):
+    path = calibration_path(model_name, sentences, index_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_calibration(model_name, sentences, calibration, index_dir=INDEX_DIR):
+    path = calibration_path(model_name, sentences, index_dir)
+    os.makedirs(index_dir, exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(calibration, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+    return path
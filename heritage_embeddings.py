@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from tracing import span
+from vector_cache import get_vector_cache
+
+# 임베딩 캐시 폴더
+CACHE_DIR = ".embedding_cache"
+HERITAGE_FILE = "busan_heritage.json"
+HERITAGE_MODEL = "paraphrase-MiniLM-L6-v2"
+
+
+# 문화유산 항목을 검색용 문장으로 바꾸기
+def heritage_sentence(item):
+    return f"{item.get('이름', '이름 없음')}는 {item.get('시대', '시대 정보 없음')} 시대의 {item.get('종류', '종류 정보 없음')}이며, {item.get('주소', '주소 정보 없음')}에 있다."
+
+
+# 데이터 파일 + 모델 이름으로 캐시 키 만들기 (파일 내용이 바뀌면 키도 바뀜)
+def cache_key(data_path, model_name):
+    h = hashlib.sha256()
+    with open(data_path, "rb") as f:
+        h.update(f.read())
+    h.update(model_name.encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+# 전체 문화유산 임베딩 행렬 불러오기 (없으면 만들어서 저장)
+#   항목별 벡터는 내용 해시로 따로 캐시해 두므로 항목을 더하거나 고치면 그 항목만 인코딩
+def load_heritage_embeddings(model, model_name=HERITAGE_MODEL, data_path=HERITAGE_FILE, data=None, cache_dir=CACHE_DIR):
+    key = cache_key(data_path, model_name)
+    cache_path = os.path.join(cache_dir, f"heritage_{key}.npy")
+    if os.path.exists(cache_path):
+        return np.load(cache_path, mmap_mode="r")
+
+    if data is None:
+        with open(data_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    sentences = [heritage_sentence(item) for item in data]
+    # 정규화해 두면 코사인 유사도 = 내적
+    with span("encode_corpus"):
+        embeddings, _ = get_vector_cache(model_name).vectors(model, sentences, corpus=data_path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = cache_path + ".tmp.npy"
+    np.save(tmp_path, embeddings)
+    os.replace(tmp_path, cache_path)
+    return embeddings
+
+
+# 질문 벡터(1번 인코딩한 것)와 필터된 행만 골라 행렬-벡터 곱
+def score_heritage(embeddings, question_vec, indices):
+    question_vec = np.asarray(question_vec, dtype=np.float32).reshape(-1)
+    question_vec = question_vec / max(float(np.linalg.norm(question_vec)), 1e-12)
+    return np.asarray(embeddings[indices]) @ question_vec
+
+
+# 오프라인 사전 계산: python heritage_embeddings.py [모델 이름]
+if __name__ == "__main__":
+    from sentence_transformers import SentenceTransformer
+
+    model_name = sys.argv[1] if len(sys.argv) > 1 else HERITAGE_MODEL
+    embeddings = load_heritage_embeddings(SentenceTransformer(model_name), model_name)
+    print(f"{model_name}: {embeddings.shape[0]}개 문화유산 임베딩 저장 완료 ({CACHE_DIR})")
@@ -0,0 +1,91 @@
+import re
+
+import numpy as np
+
+# 주소에서 구/군 이름 뽑기: "부산광역시 동래구 명륜로..." -> "동래구"
+DISTRICT_PATTERN = re.compile(r"^\S+(?:구|군)$")
+
+
+def parse_district(address):
+    for token in address.split()[1:3]:
+        if DISTRICT_PATTERN.match(token):
+            return token
+    return ""
+
+
+# 문자열 열 -> (값 목록, 항목별 코드 배열)
+def categorical(values):
+    categories = sorted(set(values))
+    lookup = {value: code for code, value in enumerate(categories)}
+    codes = np.fromiter((lookup[v] for v in values), dtype=np.int32, count=len(values))
+    return categories, codes
+
+
+# 문화유산 필터용 역색인: 종류/시대/지역 값마다 비트셋(불리언 배열)을 미리 만들어 둠
+#   items가 열 저장 표(heritage_store.HeritageTable)면 저장된 코드 열을 그대로 씀 (항목을 하나씩 보지 않음)
+class HeritageIndex:
+    def __init__(self, items):
+        self.size = len(items)
+        if hasattr(items, "codes"):
+            self.types, self.type_codes = items.categories["종류"], np.asarray(items.codes["종류"])
+            self.eras, self.era_codes = items.categories["시대"], np.asarray(items.codes["시대"])
+            self.districts, self.district_codes = items.categories["지역"], np.asarray(items.codes["지역"])
+        else:
+            self.types, self.type_codes = categorical([item.get("종류", "") for item in items])
+            self.eras, self.era_codes = categorical([item.get("시대", "") for item in items])
+            self.districts, self.district_codes = categorical([parse_district(item.get("주소", "")) for item in items])
+        self.type_bits = [self.type_codes == code for code in range(len(self.types))]
+        self.era_bits = [self.era_codes == code for code in range(len(self.eras))]
+        self.district_bits = [self.district_codes == code for code in range(len(self.districts))]
+
+        self.era_lookup = {value: code for code, value in enumerate(self.eras)}
+        self.district_lookup = {value: code for code, value in enumerate(self.districts)}
+
+        # 같은 이름의 항목 번호 (이미 보여준 항목을 이름 단위로 제외하기 위해)
+        self.names = items.column("이름") if hasattr(items, "column") else [item.get("이름") for item in items]
+        self.name_ids = {}
+        for i, name in enumerate(self.names):
+            self.name_ids.setdefault(name, []).append(i)
+
+    # 질문에서 종류 키워드/지역/시대 찾기
+    #   지역은 더 긴 이름에 포함된 짧은 이름을 뺌 ("강서구" 질문에 "서구"가 같이 걸리지 않게)
+    def parse_question(self, question, type_keywords=("유형", "무형")):
+        type_keyword = next((kw for kw in type_keywords if kw in question), None)
+        matched = [d for d in self.districts if d and d in question]
+        districts = [d for d in matched if not any(d != other and d in other for other in matched)]
+        era = next((e for e in self.eras if e and e in question), None)
+        return type_keyword, districts, era
+
+    # 조건 비트셋을 AND로 교집합, 제외 마스크는 빼기 -> 남은 항목 번호 (정렬됨)
+    def filter(self, type_keyword=None, districts=None, era=None, exclude=None):
+        mask = np.ones(self.size, dtype=bool)
+        if type_keyword:
+            type_mask = np.zeros(self.size, dtype=bool)
+            for code, value in enumerate(self.types):
+                if type_keyword in value:
+                    type_mask |= self.type_bits[code]
+            mask &= type_mask
+        if districts:
+            district_mask = np.zeros(self.size, dtype=bool)
+            for district in districts:
+                if district in self.district_lookup:
+                    district_mask |= self.district_bits[self.district_lookup[district]]
+            mask &= district_mask
+        if era:
+            if era not in self.era_lookup:
+                return np.empty(0, dtype=np.int64)
+            mask &= self.era_bits[self.era_lookup[era]]
+        if exclude is not None:
+            mask &= ~exclude
+        return np.flatnonzero(mask)
+
+    # 이미 보여준 항목 번호 집합 -> 제외 마스크
+    def exclude_mask(self, shown_ids):
+        mask = np.zeros(self.size, dtype=bool)
+        if shown_ids:
+            mask[np.fromiter(shown_ids, dtype=np.int64)] = True
+        return mask
+
+    # 한 항목을 보여주면 같은 이름의 항목도 모두 제외 대상
+    def same_name_ids(self, item_id):
+        return self.name_ids[self.names[item_id]]
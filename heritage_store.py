@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from heritage_filters import parse_district
+
+# 문화유산 JSON을 열(column) 단위로 바꿔 저장하는 폴더 (원본 파일 내용 해시마다 하나)
+STORE_DIR = ".heritage_store"
+FIELDS = ("종류", "이름", "주소", "시대", "지정날짜", "수량/면적", "소유자", "관리자")
+# 값 종류가 적은 열은 사전 인코딩 (값 목록 + 항목별 코드), 나머지는 UTF-8 바이트 + 시작 위치 배열
+CATEGORICAL_FIELDS = ("종류", "시대")
+# 주소에서 뽑은 구/군 (필터용으로만 쓰는 열)
+DISTRICT = "지역"
+
+
+def source_key(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+# 항목 목록 -> 열 파일들
+#   codes.npy: 사전 인코딩 열마다 한 행 (없는 값은 -1)
+#   data.npy + offsets.npy: 문자열 열을 이어 붙인 UTF-8 바이트와 열마다 한 행의 시작 위치, missing.npy: 없는 값 표시
+def write_columns(items, tmp_dir):
+    string_fields = [field for field in FIELDS if field not in CATEGORICAL_FIELDS]
+    meta = {"size": len(items), "fields": list(FIELDS), "strings": string_fields, "categories": {}}
+
+    columns = {field: [item.get(field) for item in items] for field in CATEGORICAL_FIELDS}
+    columns[DISTRICT] = [parse_district(item.get("주소", "")) for item in items]
+    codes = np.full((len(columns), len(items)), -1, dtype=np.int32)
+    for j, (field, values) in enumerate(columns.items()):
+        categories = sorted({v for v in values if v is not None})
+        lookup = {value: code for code, value in enumerate(categories)}
+        codes[j] = [lookup[v] if v is not None else -1 for v in values]
+        meta["categories"][field] = categories
+    np.save(os.path.join(tmp_dir, "codes.npy"), codes)
+
+    chunks = []
+    offsets = np.zeros((len(string_fields), len(items) + 1), dtype=np.int64)
+    missing = np.zeros((len(string_fields), len(items)), dtype=bool)
+    position = 0
+    for j, field in enumerate(string_fields):
+        offsets[j, 0] = position
+        for i, item in enumerate(items):
+            value = item.get(field)
+            missing[j, i] = value is None
+            encoded = (value or "").encode("utf-8")
+            chunks.append(encoded)
+            position += len(encoded)
+            offsets[j, i + 1] = position
+    np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp_dir, "data.npy"), np.frombuffer(b"".join(chunks), dtype=np.uint8))
+    np.save(os.path.join(tmp_dir, "missing.npy"), missing)
+
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+
+# 변환할 때마다 새 임시 폴더에 쓰고 이름을 바꿔서 한 번에 교체
+#   (동시에 변환하는 프로세스끼리 같은 폴더에 쓰지 않고, 다른 프로세스가 반쯤 쓴 폴더를 읽지 않게)
+def convert(items, out_dir):
+    tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(out_dir) + ".", suffix=".tmp", dir=os.path.dirname(out_dir) or ".")
+    try:
+        write_columns(items, tmp_dir)
+        try:
+            os.replace(tmp_dir, out_dir)
+        except OSError:
+            # 다른 프로세스가 먼저 만들었으면 그것을 씀
+            if not os.path.exists(os.path.join(out_dir, "meta.json")):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# 열 파일을 메모리 매핑으로 읽은 문화유산 표 (항목 목록처럼 len, [i], for로 쓸 수 있음)
+#   문자열은 항목을 볼 때만 꺼내서 디코딩
+class HeritageTable:
+    def __init__(self, store_dir):
+        with open(os.path.join(store_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.size = meta["size"]
+        self.fields = tuple(meta["fields"])
+        self.categories = meta["categories"]
+        codes = np.load(os.path.join(store_dir, "codes.npy"), mmap_mode="r")
+        self.codes = {field: codes[j] for j, field in enumerate(self.categories)}
+        offsets = np.load(os.path.join(store_dir, "offsets.npy"), mmap_mode="r")
+        missing = np.load(os.path.join(store_dir, "missing.npy"), mmap_mode="r")
+        self.string_rows = {field: j for j, field in enumerate(meta["strings"])}
+        self.offsets = offsets
+        self.missing = missing
+        self.data = np.load(os.path.join(store_dir, "data.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, row):
+        row = int(row)
+        if not -self.size <= row < self.size:
+            raise IndexError(row)
+        return HeritageRecord(self, row % self.size)
+
+    def __iter__(self):
+        return (HeritageRecord(self, row) for row in range(self.size))
+
+    # 한 칸 값 (없으면 None)
+    def value(self, row, field):
+        if field in self.codes:
+            code = int(self.codes[field][row])
+            return self.categories[field][code] if code >= 0 else None
+        j = self.string_rows[field]
+        if self.missing[j, row]:
+            return None
+        return bytes(self.data[self.offsets[j, row]:self.offsets[j, row + 1]]).decode("utf-8")
+
+    # 열 전체 (문자열 목록)
+    def column(self, field):
+        if field in self.codes:
+            categories = self.categories[field]
+            return [categories[code] if code >= 0 else None for code in self.codes[field].tolist()]
+        j = self.string_rows[field]
+        offsets = self.offsets[j].tolist()
+        raw = bytes(self.data[offsets[0]:offsets[-1]])
+        start = offsets[0]
+        return [
+            None if missing else raw[offsets[i] - start:offsets[i + 1] - start].decode("utf-8")
+            for i, missing in enumerate(self.missing[j].tolist())
+        ]
+
+
+# 표의 한 행을 dict처럼 보는 가벼운 객체 (답변 카드용, 값은 꺼낼 때 디코딩)
+class HeritageRecord:
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, field):
+        if field not in self.table.fields:
+            raise KeyError(field)
+        value = self.table.value(self.row, field)
+        if value is None:
+            raise KeyError(field)
+        return value
+
+    def get(self, field, default=None):
+        if field not in self.table.fields:
+            return default
+        value = self.table.value(self.row, field)
+        return default if value is None else value
+
+    def __contains__(self, field):
+        return self.get(field) is not None
+
+    def keys(self):
+        return [field for field in self.table.fields if field in self]
+
+    def to_dict(self):
+        return {field: self[field] for field in self.keys()}
+
+    def __eq__(self, other):
+        if isinstance(other, HeritageRecord):
+            return self.table is other.table and self.row == other.row
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self.table), self.row))
+
+    def __repr__(self):
+        return f"HeritageRecord({self.row}, {self.get('이름')!r})"
+
+
+# 문화유산 JSON -> 열 저장 폴더 경로 (원본이 바뀌었으면 그때 한 번 변환)
+def store_path(data_path, store_dir=STORE_DIR):
+    out_dir = os.path.join(store_dir, f"heritage_{source_key(data_path)}")
+    if not os.path.exists(os.path.join(out_dir, "meta.json")):
+        with open(data_path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        os.makedirs(store_dir, exist_ok=True)
+        convert(items, out_dir)
+    return out_dir
+
+
+def load_heritage_table(data_path, store_dir=STORE_DIR):
+    return HeritageTable(store_path(data_path, store_dir))
+
+
+# 사용 예: python heritage_store.py [busan_heritage.json]  -> 변환하고 JSON과 읽기 시간/크기 비교
+if __name__ == "__main__":
+    import tracemalloc
+
+    from heritage_embeddings import HERITAGE_FILE
+
+    data_path = sys.argv[1] if len(sys.argv) > 1 else HERITAGE_FILE
+    out_dir = store_path(data_path)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    with open(data_path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    json_ms = (time.perf_counter() - started) * 1000
+    json_bytes = tracemalloc.get_traced_memory()[0]
+    del items
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    table = HeritageTable(out_dir)
+    table_ms = (time.perf_counter() - started) * 1000
+    table_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    disk = sum(os.path.getsize(os.path.join(out_dir, name)) for name in os.listdir(out_dir))
+    print(f"{len(table)}개 항목 -> {out_dir} ({disk / 1024:.1f} KB, 원본 {os.path.getsize(data_path) / 1024:.1f} KB)")
+    print(f"JSON 읽기 {json_ms:.1f} ms, 파이썬 메모리 {json_bytes / 1024:.1f} KB")
+    print(f"열 저장 읽기 {table_ms:.1f} ms, 파이썬 메모리 {table_bytes / 1024:.1f} KB (메모리 매핑)")
@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import closing, contextmanager
+
+from tracing import span
+
+# 세션마다 메모리에 들고 있는 최근 질문/답변 수 (넘치면 가장 오래된 것부터 버림)
+HISTORY_MAX = int(os.environ.get("EDU_CHATBOT_HISTORY_MAX", "200"))
+# 기록 화면 한 페이지에 그리는 질문 수
+PAGE_SIZE = 10
+# 기록을 저장할 SQLite 파일 (비우면 메모리에만, 저장하면 주소의 ?session=으로 이어서 보기 가능)
+HISTORY_DB = os.environ.get("EDU_CHATBOT_HISTORY_DB", "")
+
+_db_lock = threading.Lock()
+
+
+# 연결 하나를 열어 한 트랜잭션으로 쓰고 닫음 (sqlite3 연결의 with는 커밋만 하고 닫지 않음)
+@contextmanager
+def connect(db_path):
+    with closing(sqlite3.connect(db_path, timeout=10)) as conn, conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "scope TEXT, session TEXT, seq INTEGER, question TEXT, answer TEXT, created REAL, "
+            "PRIMARY KEY (scope, session, seq))"
+        )
+        yield conn
+
+
+# 한 세션의 질문/답변 기록: 최근 max_items개만 deque로 들고 있고,
+#   db_path가 있으면 모두 SQLite에 써 두어 오래된 페이지는 파일에서 읽고 다음 접속 때 이어서 봄
+#   번호는 최신 질문이 1
+class ChatHistory:
+    def __init__(self, scope, session_id=None, max_items=HISTORY_MAX, db_path=HISTORY_DB):
+        self.scope = scope
+        self.session_id = session_id or uuid.uuid4().hex
+        self.db_path = db_path
+        # (순번, 질문, 답변), 오래된 것 -> 최신
+        self.items = deque(maxlen=max_items)
+        self.total = 0
+        if db_path:
+            self._resume()
+
+    def _resume(self):
+        with _db_lock, connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT seq, question, answer FROM history WHERE scope = ? AND session = ? ORDER BY seq DESC LIMIT ?",
+                (self.scope, self.session_id, self.items.maxlen),
+            ).fetchall()
+        self.items.extend(reversed(rows))
+        self.total = rows[0][0] + 1 if rows else 0
+
+    def append(self, question, answer):
+        seq = self.total
+        self.total += 1
+        self.items.append((seq, question, answer))
+        if self.db_path:
+            with _db_lock, connect(self.db_path) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.scope, self.session_id, seq, question, answer, time.time()),
+                )
+
+    def clear(self):
+        self.items.clear()
+        self.total = 0
+        if self.db_path:
+            with _db_lock, connect(self.db_path) as conn:
+                conn.execute("DELETE FROM history WHERE scope = ? AND session = ?", (self.scope, self.session_id))
+
+    # 볼 수 있는 기록 수 (SQLite에 저장하면 메모리에서 버린 것도 포함)
+    def __len__(self):
+        return self.total if self.db_path else len(self.items)
+
+    def page_count(self, size=PAGE_SIZE):
+        return max(1, -(-len(self) // size))
+
+    # page번째 페이지(0부터, 최신 먼저) -> [(번호, 질문, 답변)]
+    def page(self, page=0, size=PAGE_SIZE):
+        first = page * size
+        newest = self.total - 1 - first
+        oldest = max(newest - size + 1, self.total - len(self))
+        if newest < oldest:
+            return []
+        in_memory = self.items[0][0] if self.items else self.total
+        rows = []
+        if oldest < in_memory:
+            with _db_lock, connect(self.db_path) as conn:
+                rows = conn.execute(
+                    "SELECT seq, question, answer FROM history WHERE scope = ? AND session = ? AND seq BETWEEN ? AND ? ORDER BY seq",
+                    (self.scope, self.session_id, oldest, min(newest, in_memory - 1)),
+                ).fetchall()
+        start = max(oldest, in_memory)
+        rows += [self.items[seq - in_memory] for seq in range(start, newest + 1)]
+        return [(self.total - seq, question, answer) for seq, question, answer in reversed(rows)]
+
+
+# Streamlit 세션의 기록 (SQLite에 저장하면 주소에 ?session=을 붙여 새로고침해도 이어서 봄)
+def session_history(st, scope, key="history"):
+    if not isinstance(st.session_state.get(key), ChatHistory):
+        session_id = st.query_params.get("session") if HISTORY_DB else None
+        st.session_state[key] = ChatHistory(scope, session_id)
+        if HISTORY_DB:
+            st.query_params["session"] = st.session_state[key].session_id
+    return st.session_state[key]
+
+
+# 기록을 한 페이지씩만 그리기 (render를 주면 (번호, 질문, 답변)마다 그 함수로 그림)
+def show_history(st, history, title="📜 이전 질문 기록", unsafe_allow_html=False, render=None):
+    if not len(history):
+        return
+    st.markdown("---")
+    st.subheader(title)
+    page = 1
+    if history.page_count() > 1:
+        page = st.number_input("페이지 (1이 최신)", min_value=1, max_value=history.page_count(), value=1, step=1, key="history_page")
+    with span("render_history"):
+        for number, question, answer in history.page(page - 1):
+            if render is not None:
+                render(number, question, answer)
+                continue
+            with st.expander(f"Q{number}: {question}", expanded=False):
+                st.markdown(answer, unsafe_allow_html=unsafe_allow_html)
@@ -0,0 +1,165 @@
+import json
+import os
+import random
+import sys
+from collections import deque
+
+# 규칙 파일에서 쓸 수 있는 키
+#   조건: all (모두 포함) / any (하나라도 포함) / none (하나도 포함하지 않음)
+#   동작: answer (답변 문장 번호, 목록이면 그중 무작위) / text (답변 글) /
+#         ids (이 문장들 안에서만 검색) / contains (이 글이 들어간 문장들 안에서만 검색) / fallback (검색 실패 시 답변)
+CONDITION_KEYS = ("all", "any", "none")
+ACTION_KEYS = ("answer", "text", "ids", "contains", "fallback")
+
+
+# 여러 키워드를 질문에서 한 번에 찾는 Aho–Corasick 오토마톤 (질문을 한 번만 훑음)
+class AhoCorasick:
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.out[state].append(keyword_id)
+
+        # 실패 링크: 너비 우선으로 채우고, 실패 상태의 출력도 함께 물려받음
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    # 질문에 들어 있는 키워드 번호 집합
+    def find(self, text):
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            if self.out[state]:
+                found.update(self.out[state])
+        return found
+
+
+# 규칙 파일 하나 = 컬렉션 하나의 키워드 라우팅
+#   규칙은 위에서부터 확인해 처음 맞는 것을 사용, 아무것도 맞지 않으면 default
+#   route(질문) -> {"answer": ...} 이면 모델 없이 바로 답변, 아니면 {"ids", "fallback"}을 검색에 그대로 넘김
+class KeywordRouter:
+    def __init__(self, rules, entries, default=None, source="규칙"):
+        self.source = source
+        self.entries = entries
+        self.rules = [self._check(rule, i) for i, rule in enumerate(rules)]
+        self.default = self._check(default, "default") if default else None
+
+        keywords = sorted({kw for rule in self.rules for key in CONDITION_KEYS for kw in rule.get(key, ())})
+        keyword_ids = {kw: i for i, kw in enumerate(keywords)}
+        self.automaton = AhoCorasick(keywords)
+
+        # 키워드 번호 집합으로 바꿔 두고, 키워드별로 그 키워드를 쓰는 규칙 번호를 모아 둠
+        self._conditions = []
+        self._rules_by_keyword = [[] for _ in keywords]
+        self._always = []
+        for i, rule in enumerate(self.rules):
+            condition = {key: frozenset(keyword_ids[kw] for kw in rule.get(key, ())) for key in CONDITION_KEYS}
+            self._conditions.append(condition)
+            if condition["all"] or condition["any"]:
+                for keyword_id in condition["all"] | condition["any"]:
+                    self._rules_by_keyword[keyword_id].append(i)
+            else:
+                self._always.append(i)
+
+        self._actions = [self._compile(rule) for rule in self.rules]
+        self._default_action = self._compile(self.default) if self.default else {}
+
+    def _check(self, rule, where):
+        unknown = set(rule) - set(CONDITION_KEYS) - set(ACTION_KEYS) - {"name"}
+        if unknown:
+            raise ValueError(f"{self.source} {where}: 알 수 없는 키입니다: {', '.join(sorted(unknown))}")
+        for key in CONDITION_KEYS:
+            if isinstance(rule.get(key), str):
+                rule = {**rule, key: [rule[key]]}
+        answers = rule.get("answer")
+        for i in answers if isinstance(answers, list) else [] if answers is None else [answers]:
+            if not 0 <= i < len(self.entries):
+                raise ValueError(f"{self.source} {where}: 답변 문장 번호 {i}가 지식 파일 범위를 벗어났습니다")
+        return rule
+
+    # 검색 범위(contains)는 불러올 때 한 번만 문장 번호로 바꿔 둠
+    def _compile(self, rule):
+        action = {}
+        if "text" in rule:
+            action["text"] = rule["text"]
+        if "answer" in rule:
+            action["answer"] = rule["answer"] if isinstance(rule["answer"], list) else [rule["answer"]]
+        if "ids" in rule:
+            action["ids"] = list(rule["ids"])
+        if "contains" in rule:
+            ids = [i for i, entry in enumerate(self.entries) if rule["contains"] in entry["search"]]
+            action["ids"] = [i for i in action["ids"] if i in set(ids)] if "ids" in action else ids
+        if "fallback" in rule:
+            action["fallback"] = rule["fallback"]
+        return action
+
+    def _matches(self, i, found):
+        condition = self._conditions[i]
+        return (
+            condition["all"] <= found
+            and (not condition["any"] or bool(condition["any"] & found))
+            and not condition["none"] & found
+        )
+
+    def match(self, question):
+        found = self.automaton.find(question)
+        candidates = set(self._always)
+        for keyword_id in found:
+            candidates.update(self._rules_by_keyword[keyword_id])
+        for i in sorted(candidates):
+            if self._matches(i, found):
+                return self.rules[i], self._actions[i]
+        return self.default, self._default_action
+
+    def route(self, question):
+        _, action = self.match(question)
+        if "text" in action:
+            return {"answer": action["text"]}
+        if "answer" in action:
+            return {"answer": self.entries[random.choice(action["answer"])]["full"]}
+        return {key: action[key] for key in ("ids", "fallback") if key in action}
+
+
+def load_router(path, entries):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return KeywordRouter(data.get("rules", []), entries, data.get("default"), source=os.path.basename(path))
+
+
+# 사용 예: python keyword_router.py energy3 "1인당 온실가스 배출량은?"  -> 어떤 규칙으로 라우팅되는지 확인
+if __name__ == "__main__":
+    from retrieval_engine import get_engine
+
+    engine = get_engine()
+    router = engine.router(sys.argv[1])
+    if router is None:
+        print(f"{sys.argv[1]}: 규칙 파일이 없습니다")
+        sys.exit(1)
+    for question in sys.argv[2:]:
+        rule, _ = router.match(question)
+        if rule is None:
+            label = "검색"
+        else:
+            label = "default" if rule is router.default else rule.get("name", f"규칙 {router.rules.index(rule)}")
+        print(f"{question} -> [{label}] {router.route(question)}")
@@ -0,0 +1,194 @@
+import argparse
+import gc
+import os
+import re
+import signal
+import sys
+import time
+import traceback
+
+from onnx_encoder import DEFAULT_BACKEND
+from lazy_loader import WARMUP_QUESTION
+from retrieval_engine import get_engine, get_model
+
+# 작업자 하나가 시작한 뒤 메모리를 재기까지 기다리는 시간(초)
+MEMORY_REPORT_DELAY = 20
+
+
+# 화면 스크립트에서 쓰는 컬렉션 이름 찾기 (prewarm("heritage"), LOADER.start(["busan"]) 같은 따옴표 안의 이름)
+def script_collections(path, names):
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    found = re.findall(r"[\"']([\w.]+)[\"']", source)
+    return [name for name in dict.fromkeys(found) if name in names]
+
+
+# 부모 프로세스에서 모델, 인덱스, 임베딩 행렬을 한 번만 불러오고 예열
+#   torch 백엔드만 미리 불러옴 (ONNX Runtime 세션은 fork 뒤에 쓸 수 없어서 작업자마다 따로 불러옴)
+def preload(engine, names):
+    timings = {}
+    for name in names:
+        spec = engine.specs[name]
+        if (spec.get("backend") or DEFAULT_BACKEND) != "torch":
+            print(f"  {name}: {spec.get('backend') or DEFAULT_BACKEND} 백엔드는 작업자마다 따로 불러옵니다")
+            continue
+        started = time.perf_counter()
+        get_model(spec["model"], spec.get("backend"))
+        collection = engine.collection(name)
+        collection.model.encode([WARMUP_QUESTION], convert_to_numpy=True)
+        timings[name] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+# 작업자 하나가 쓸 계산 스레드 수: CPU 코어를 작업자끼리 나눔 (코어보다 많이 만들면 서로 기다리기만 함)
+def threads_per_worker(workers, cpus=None):
+    if cpus is None:
+        cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    return max(1, cpus // max(1, workers))
+
+
+def set_threads(threads):
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    try:
+        import faiss
+
+        faiss.omp_set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+# 프로세스 메모리(MB): rss 전체, pss(공유 페이지를 나눠 센 값), private(이 프로세스만 쓰는 값)
+def memory_usage(pid):
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                    usage[key] = int(value.split()[0]) / 1024
+    except OSError:
+        return None
+    return {
+        "rss": usage.get("Rss", 0.0),
+        "pss": usage.get("Pss", 0.0),
+        "private": usage.get("Private_Clean", 0.0) + usage.get("Private_Dirty", 0.0),
+    }
+
+
+# 자식 프로세스: 스레드 수를 정하고 이 프로세스 안에서 Streamlit 서버 실행
+#   부모가 불러온 모델과 인덱스는 retrieval_engine 안에 그대로 있으므로 화면 스크립트는 다시 불러오지 않음
+def run_worker(script, port, threads, address):
+    set_threads(threads)
+    from streamlit.web import bootstrap
+
+    flags = {
+        "server_port": port,
+        "server_address": address,
+        "server_headless": True,
+        "server_fileWatcherType": "none",
+        "server_runOnSave": False,
+    }
+    bootstrap.load_config_options(flag_options=flags)
+    bootstrap.run(os.path.abspath(script), False, [], flags)
+
+
+def fork_worker(script, port, threads, address):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(script, port, threads, address)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        # 부모에서 물려받은 정리 코드(atexit 등)는 실행하지 않고 끝냄
+        os._exit(code)
+    return pid
+
+
+# 사용 예: python launcher.py busan_jeju.py heritage_busan.py --workers 3 --port 8501
+#   스크립트마다 작업자 workers개를 port부터 차례로 띄움 (앞에 nginx 같은 부하 분산기를 두고 세션 고정으로 연결)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="모델을 한 번만 불러오고 Streamlit 작업자 프로세스를 fork해서 함께 쓰기")
+    parser.add_argument("scripts", nargs="+", help="실행할 Streamlit 화면 스크립트")
+    parser.add_argument("--workers", type=int, default=2, help="스크립트마다 띄울 작업자 수")
+    parser.add_argument("--port", type=int, default=8501, help="첫 작업자 포트 (다음 작업자는 1씩 증가)")
+    parser.add_argument("--address", default=os.environ.get("EDU_CHATBOT_HOST", "127.0.0.1"))
+    parser.add_argument("--threads", type=int, default=None, help="작업자마다 계산 스레드 수 (기본: 코어 수 / 전체 작업자 수)")
+    parser.add_argument("--preload", nargs="*", default=None, help="미리 불러올 컬렉션 (기본: 스크립트에서 찾은 컬렉션)")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("fork를 지원하지 않는 운영체제입니다. answer_server.py로 모델을 한 프로세스에 모아 쓰세요.")
+
+    engine = get_engine()
+    names = args.preload
+    if names is None:
+        names = list(dict.fromkeys(name for script in args.scripts for name in script_collections(script, engine.names())))
+    total_workers = args.workers * len(args.scripts)
+    threads = args.threads or threads_per_worker(total_workers)
+
+    # 부모는 계산 스레드 풀을 만들지 않도록 1개로 불러옴 (fork한 뒤 자식에서 스레드 풀이 멈추는 것을 막음)
+    set_threads(1)
+    print(f"미리 불러오기: {', '.join(names) or '없음'}")
+    for name, ms in preload(engine, names).items():
+        print(f"  {name}: {ms:.0f} ms")
+    # 불러온 객체를 GC가 다시 훑으며 공유 페이지에 쓰지 않도록 고정 (copy-on-write 유지)
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+    port = args.port
+    for script in args.scripts:
+        for _ in range(args.workers):
+            pid = fork_worker(script, port, threads, args.address)
+            workers[pid] = (script, port)
+            print(f"작업자 {pid}: {script} -> http://{args.address}:{port} (스레드 {threads})")
+            port += 1
+
+    stopping = False
+
+    def stop(signum, frame):
+        global stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    report_at = time.monotonic() + MEMORY_REPORT_DELAY
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            if report_at is not None and time.monotonic() >= report_at:
+                report_at = None
+                parent = memory_usage(os.getpid())
+                usages = {pid: memory_usage(pid) for pid in workers}
+                if parent is not None:
+                    print(f"메모리(MB) 부모: rss {parent['rss']:.0f}, pss {parent['pss']:.0f}")
+                    for pid, usage in usages.items():
+                        if usage is not None:
+                            print(f"  작업자 {pid}: rss {usage['rss']:.0f}, pss {usage['pss']:.0f}, 혼자 쓰는 메모리 {usage['private']:.0f}")
+                    total = parent["pss"] + sum(u["pss"] for u in usages.values() if u is not None)
+                    print(f"  합계(pss) {total:.0f} MB")
+            time.sleep(0.5)
+            continue
+        script, worker_port = workers.pop(pid)
+        if not stopping:
+            # 작업자가 죽으면 모델을 불러 둔 부모에서 다시 fork
+            print(f"작업자 {pid} 종료 (상태 {status}), 다시 시작: {script} :{worker_port}")
+            new_pid = fork_worker(script, worker_port, threads, args.address)
+            workers[new_pid] = (script, worker_port)
@@ -0,0 +1,115 @@
+import sys
+import threading
+import time
+
+from retrieval_engine import get_engine, get_model
+
+WARMUP_QUESTION = "준비 운동 질문입니다"
+
+
+# 무거운 모듈 import 시간 재기 (이미 import된 모듈은 0에 가까움)
+def timed_import(module_name):
+    started = time.perf_counter()
+    __import__(module_name)
+    return (time.perf_counter() - started) * 1000
+
+
+# 모델과 인덱스를 백그라운드 스레드에서 불러오고, 더미 질문으로 미리 예열
+#   화면은 바로 그리고, 준비 상태(ready)와 단계별 소요 시간(timings)을 보여줄 수 있음
+class BackgroundLoader:
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.timings = {}
+        self.errors = {}
+        self._events = {}
+        self._lock = threading.Lock()
+        self._imports_done = False
+
+    # 아직 시작하지 않은 컬렉션만 백그라운드에서 불러오기 시작 (여러 번 불러도 안전)
+    def start(self, names):
+        with self._lock:
+            new_names = [name for name in names if name not in self._events]
+            for name in new_names:
+                self._events[name] = threading.Event()
+        if new_names:
+            threading.Thread(target=self._load, args=(new_names,), daemon=True).start()
+
+    def _load(self, names):
+        if not self._imports_done:
+            # 같은 모듈을 두 스레드가 동시에 재도 결과는 거의 같으므로 잠금 없이 기록
+            for module_name in ("torch", "sentence_transformers", "faiss"):
+                try:
+                    self.timings[f"import {module_name}"] = timed_import(module_name)
+                except ImportError:
+                    pass
+            self._imports_done = True
+
+        engine = self.engine or get_engine()
+        for name in names:
+            try:
+                spec = engine.specs[name]
+                started = time.perf_counter()
+                get_model(spec["model"], spec.get("backend"))
+                model_loaded = time.perf_counter()
+                collection = engine.collection(name)
+                loaded = time.perf_counter()
+                collection.model.encode([WARMUP_QUESTION], convert_to_numpy=True)
+                warmed = time.perf_counter()
+                # 재정렬 모델도 미리 불러옴 (불러오는 동안 들어온 질문은 1단계 순서로 답함)
+                reranker = getattr(collection, "reranker", None)
+                if reranker is not None:
+                    reranker.load()
+                    self.timings.setdefault(f"reranker {reranker.name}", (time.perf_counter() - warmed) * 1000)
+                # 이미 불러온 모델은 다시 재지 않음
+                self.timings.setdefault(f"model {spec['model']}", (model_loaded - started) * 1000)
+                self.timings[f"index {name}"] = (loaded - model_loaded) * 1000
+                self.timings[f"warmup {name}"] = (warmed - loaded) * 1000
+            except Exception as e:
+                self.errors[name] = e
+            finally:
+                self._events[name].set()
+
+    def ready(self, name):
+        event = self._events.get(name)
+        return event is not None and event.is_set() and name not in self.errors
+
+    # 준비될 때까지 기다렸다가 컬렉션 돌려주기 (불러오다 실패했으면 그 예외를 다시 발생)
+    def wait(self, name, timeout=None):
+        self.start([name])
+        self._events[name].wait(timeout)
+        if name in self.errors:
+            raise self.errors[name]
+        return (self.engine or get_engine()).collection(name)
+
+    def status(self):
+        with self._lock:
+            names = list(self._events)
+        return {
+            "ready": [name for name in names if self.ready(name)],
+            "loading": [name for name in names if not self._events[name].is_set()],
+            "failed": {name: str(e) for name, e in self.errors.items()},
+            "timings_ms": dict(self.timings),
+        }
+
+
+# 프로세스 전체에서 함께 쓰는 로더 (Streamlit 재실행 사이에도 유지됨)
+LOADER = BackgroundLoader()
+
+
+# Streamlit 화면용 준비 상태 표시
+def show_status(st, name):
+    if LOADER.ready(name):
+        return
+    if name in LOADER.errors:
+        st.error(f"챗봇을 준비하지 못했어요: {LOADER.errors[name]}")
+    else:
+        st.info("⏳ 챗봇이 준비 중이에요. 질문을 입력하면 준비되는 대로 답해 줄게요!")
+
+
+# 사용 예: python lazy_loader.py energy3 heritage  -> import/로드/예열 시간 보고
+if __name__ == "__main__":
+    names = sys.argv[1:] or get_engine().names()
+    for name in names:
+        LOADER.wait(name)
+    for stage, ms in LOADER.status()["timings_ms"].items():
+        print(f"{stage:40s} {ms:10.1f} ms")
@@ -0,0 +1,130 @@
+import re
+import unicodedata
+
+import numpy as np
+
+# 한글은 형태소 분석기 없이 글자 n-gram으로 색인 (조사가 붙어도 "해운대구의" -> "해운", "운대", "대구" ... 가 겹침)
+NGRAM_SIZES = (2, 3)
+# 확실한 키워드 일치로 볼 조건: 1등 BM25 점수가 2등의 몇 배 이상인지
+SHORTCUT_RATIO = 2.0
+# 자주 붙는 조사/어미 (질문 단어 끝에서 떼고 정확히 일치하는지 확인)
+SUFFIXES = ("에서는", "에서", "으로", "은", "는", "이", "가", "을", "를", "의", "에", "로", "와", "과", "도", "만", "요")
+# 검색 결과를 합칠 때 쓰는 상수 (Reciprocal Rank Fusion)
+RRF_K = 60
+
+_punct = re.compile(r"[^\w\s]")
+
+
+def words(text):
+    text = unicodedata.normalize("NFC", text).lower()
+    return _punct.sub(" ", text).split()
+
+
+# 단어 안에서만 글자 n-gram 만들기 (한 글자 단어는 그대로)
+def char_ngrams(text, sizes=NGRAM_SIZES):
+    grams = []
+    for word in words(text):
+        if len(word) < min(sizes):
+            grams.append(word)
+            continue
+        for n in sizes:
+            grams.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return grams
+
+
+# 질문 단어에서 조사를 뗀 키워드 (두 글자 이상)
+def keywords(text):
+    result = []
+    for word in words(text):
+        for suffix in SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+                word = word[:-len(suffix)]
+                break
+        if len(word) >= 2:
+            result.append(word)
+    return result
+
+
+# 글자 n-gram BM25 색인: 단어별로 (문서 번호, 미리 계산한 가중치) 배열을 들고 있어 질문 점수는 해당 단어 목록만 더함
+class BM25Index:
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.texts = [unicodedata.normalize("NFC", t).lower() for t in texts]
+        self.size = len(texts)
+        docs = [char_ngrams(t) for t in texts]
+        lengths = np.array([len(d) for d in docs], dtype=np.float32)
+        avg_length = float(lengths.mean()) if self.size and lengths.mean() > 0 else 1.0
+
+        counts = {}
+        for doc_id, grams in enumerate(docs):
+            for gram in grams:
+                tf = counts.setdefault(gram, {})
+                tf[doc_id] = tf.get(doc_id, 0) + 1
+
+        self.postings = {}
+        for gram, tf in counts.items():
+            ids = np.fromiter(tf.keys(), dtype=np.int64, count=len(tf))
+            freqs = np.fromiter(tf.values(), dtype=np.float32, count=len(tf))
+            idf = np.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = k1 * (1 - b + b * lengths[ids] / avg_length)
+            self.postings[gram] = (ids, (idf * freqs * (k1 + 1) / (freqs + norm)).astype(np.float32))
+
+    # 모든 문서의 BM25 점수 (ids를 주면 그 문서들 점수만, 같은 순서로)
+    def scores(self, question, ids=None):
+        scores = np.zeros(self.size, dtype=np.float32)
+        for gram in set(char_ngrams(question)):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        return scores if ids is None else scores[np.asarray(ids, dtype=np.int64)]
+
+    # 점수가 0보다 큰 문서 번호를 점수 순으로
+    def ranking(self, scores, ids=None):
+        ids = np.arange(len(scores)) if ids is None else np.asarray(ids, dtype=np.int64)
+        order = np.argsort(-scores, kind="stable")
+        order = order[scores[order] > 0]
+        return ids[order].tolist()
+
+    # 확실한 키워드 일치: 1등이 2등보다 SHORTCUT_RATIO배 이상 높고,
+    # 질문 키워드가 1등 문장에 그대로 들어 있으면서 2등 문장에는 없을 때 -> 1등 문서 번호, 아니면 None
+    def exact_hit(self, question, scores, ids=None):
+        ids = np.arange(len(scores)) if ids is None else np.asarray(ids, dtype=np.int64)
+        if len(scores) == 0:
+            return None
+        order = np.argsort(-scores, kind="stable")[:2]
+        best = float(scores[order[0]])
+        second = float(scores[order[1]]) if len(order) > 1 else 0.0
+        if best <= 0 or best < SHORTCUT_RATIO * second:
+            return None
+        best_text = self.texts[ids[order[0]]]
+        second_text = self.texts[ids[order[1]]] if len(order) > 1 else ""
+        if any(kw in best_text and kw not in second_text for kw in keywords(question)):
+            return int(ids[order[0]])
+        return None
+
+
+# 여러 순위 목록을 Reciprocal Rank Fusion으로 합치기 -> 문서 번호 목록 (앞 목록이 같은 점수일 때 우선)
+def rrf(rankings, k=RRF_K):
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    first_seen = {}
+    for ranking in rankings:
+        for doc_id in ranking:
+            first_seen.setdefault(doc_id, len(first_seen))
+    return sorted(fused, key=lambda doc_id: (-fused[doc_id], first_seen[doc_id]))
+
+
+# 점수 배열 -> 순위 (같은 점수는 같은 순위, 0부터)
+def tied_ranks(scores):
+    ordered = np.sort(-scores)
+    return np.searchsorted(ordered, -scores, side="left")
+
+
+# 점수 배열 버전 RRF: 의미 점수(모든 문서)와 BM25 점수(0보다 큰 문서만)를 순위로 바꿔 더함
+#   같은 점수는 같은 순위라서, 합친 점수가 같은 문서끼리는 무작위로 고를 수 있음
+def rrf_scores(dense_scores, lexical_scores, k=RRF_K):
+    fused = 1.0 / (k + tied_ranks(dense_scores) + 1)
+    matched = lexical_scores > 0
+    fused[matched] += 1.0 / (k + tied_ranks(lexical_scores)[matched] + 1)
+    return fused
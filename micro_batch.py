@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+import numpy as np
+
+# 살아 있는 MicroBatcher (fork한 자식 프로세스에서 모으는 스레드를 다시 띄우기 위해)
+_batchers = weakref.WeakSet()
+
+
+# 짧은 시간(window_ms) 안에 들어온 요청을 모아 한 번에 처리하고 결과를 각 요청자에게 돌려줌
+#   fn: 항목 목록 -> 같은 순서의 결과 목록
+#   executor를 주면 모인 배치를 작업자 풀에서 실행 (여러 배치를 동시에 처리)
+class MicroBatcher:
+    def __init__(self, fn, window_ms=10, max_batch=32, executor=None):
+        self.fn = fn
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.executor = executor
+        self.batches = 0
+        self.items = 0
+        self._start()
+        _batchers.add(self)
+
+    def _start(self):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._collect, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.batches += 1
+            self.items += len(batch)
+            if self.executor is not None:
+                self.executor.submit(self._run, batch)
+            else:
+                self._run(batch)
+
+    def _run(self, batch):
+        try:
+            results = self.fn([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+
+# fork하면 스레드는 자식에 따라오지 않으므로 자식에서 큐와 스레드를 새로 만듦 (launcher.py)
+def _restart_after_fork():
+    for batcher in list(_batchers):
+        batcher._start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+# SentenceTransformer 앞에 두는 배치 인코더
+#   질문 하나짜리 encode 호출을 window_ms 동안 모아 한 번의 forward로 인코딩하고 벡터를 나눠 줌
+#   여러 문장을 한 번에 넣는 호출(지식 파일 임베딩 등)은 그대로 모델에 전달
+class BatchingEncoder:
+    def __init__(self, model, window_ms=5, max_batch=32):
+        self.model = model
+        self.max_batch = max_batch
+        self.batcher = MicroBatcher(self._encode_batch, window_ms, max_batch)
+
+    def _encode_batch(self, sentences):
+        return list(self.model.encode(sentences, convert_to_numpy=True, batch_size=self.max_batch))
+
+    def encode(self, sentences, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        if kwargs.get("convert_to_tensor") or not convert_to_numpy or (not single and len(sentences) != 1):
+            return self.model.encode(sentences, convert_to_numpy=convert_to_numpy, normalize_embeddings=normalize_embeddings, **kwargs)
+
+        vector = self.batcher(sentences if single else sentences[0])
+        if normalize_embeddings:
+            vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        return vector if single else vector[np.newaxis, :]
+
+    def stats(self):
+        return self.batcher.stats()
+
+    # 나머지 속성(get_sentence_embedding_dimension 등)은 원래 모델 것을 사용
+    def __getattr__(self, name):
+        return getattr(self.model, name)
@@ -0,0 +1,119 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+# 인코더 백엔드: torch (PyTorch fp32) / onnx (ONNX Runtime fp32) / onnx-int8 (동적 int8 양자화)
+BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_BACKEND = os.environ.get("EDU_CHATBOT_BACKEND", "torch")
+ONNX_DIR = ".onnx_cache"
+# 학교 노트북 CPU에 맞는 양자화 설정 (avx2 / avx512 / avx512_vnni / arm64)
+QUANTIZATION = os.environ.get("EDU_CHATBOT_QUANTIZATION", "avx2")
+
+
+# 캐시 키에 쓰는 모델 id: 백엔드가 다르면 임베딩도 조금씩 달라서 인덱스를 따로 저장
+def model_key(model_name, backend="torch"):
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def export_dir(model_name):
+    return os.path.join(ONNX_DIR, model_name.replace("/", "__"))
+
+
+# ONNX로 내보낸 모델 불러오기 (처음 한 번만 내보내고 .onnx_cache에 저장)
+#   pip install "sentence-transformers[onnx]" 필요
+def load_onnx_model(model_name, quantized=False):
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    path = export_dir(model_name)
+    if not os.path.exists(os.path.join(path, "onnx", "model.onnx")):
+        model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+        model.save(path)
+
+    if not quantized:
+        return SentenceTransformer(path, backend="onnx", device="cpu")
+
+    file_name = f"model_qint8_{QUANTIZATION}.onnx"
+    if not os.path.exists(os.path.join(path, "onnx", file_name)):
+        model = SentenceTransformer(path, backend="onnx", device="cpu")
+        export_dynamic_quantized_onnx_model(model, QUANTIZATION, path)
+    return SentenceTransformer(path, backend="onnx", device="cpu", model_kwargs={"file_name": f"onnx/{file_name}"})
+
+
+def load_encoder(model_name, backend="torch"):
+    if backend not in BACKENDS:
+        raise ValueError(f"알 수 없는 백엔드입니다: {backend} ({', '.join(BACKENDS)})")
+    if backend == "torch":
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        return SentenceTransformer(model_name, device=device)
+    return load_onnx_model(model_name, quantized=backend == "onnx-int8")
+
+
+def top_k(index_vecs, query_vecs, k):
+    scores = query_vecs @ index_vecs.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def normalize(vecs):
+    vecs = np.asarray(vecs, dtype=np.float32)
+    return vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+
+
+# fp32 모델 대비 검색 일치율: 같은 질문에 같은 1등 문장을 고르는 비율, 상위 k개 겹침, 임베딩 코사인 유사도
+def agreement(reference, candidate, sentences, questions, k=3):
+    ref_docs = normalize(reference.encode(sentences, convert_to_numpy=True))
+    cand_docs = normalize(candidate.encode(sentences, convert_to_numpy=True))
+    ref_queries = normalize(reference.encode(questions, convert_to_numpy=True))
+    cand_queries = normalize(candidate.encode(questions, convert_to_numpy=True))
+
+    k = min(k, len(sentences))
+    ref_top = top_k(ref_docs, ref_queries, k)
+    cand_top = top_k(cand_docs, cand_queries, k)
+    return {
+        "sentences": len(sentences),
+        "questions": len(questions),
+        "top1_agreement": float(np.mean(ref_top[:, 0] == cand_top[:, 0])),
+        f"top{k}_overlap": float(np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_top, cand_top)])),
+        "embedding_cosine": float(np.mean(np.sum(ref_docs * cand_docs, axis=1))),
+    }
+
+
+# 사용 예: python onnx_encoder.py --backend onnx-int8 -o onnx_agreement.json
+#   각 컬렉션의 모델을 내보내고(캐시), fp32 PyTorch 모델과 검색 결과가 얼마나 같은지 보고
+if __name__ == "__main__":
+    from benchmark import SAMPLE_QUESTIONS
+    from heritage_embeddings import heritage_sentence
+    from retrieval_engine import COLLECTIONS, load_entries
+
+    parser = argparse.ArgumentParser(description="ONNX / int8 인코더 내보내기와 fp32 대비 검색 일치율 보고")
+    parser.add_argument("--backend", default="onnx-int8", choices=BACKENDS[1:])
+    parser.add_argument("-o", "--output", default="onnx_agreement.json")
+    args = parser.parse_args()
+
+    reports = {}
+    models = {}
+    for name, spec in COLLECTIONS.items():
+        model_name = spec["model"]
+        if model_name not in models:
+            models[model_name] = (load_encoder(model_name, "torch"), load_encoder(model_name, args.backend))
+        reference, candidate = models[model_name]
+
+        entries = load_entries(spec["path"], spec["format"])
+        if spec["format"] == "heritage":
+            sentences = [heritage_sentence(item) for item in entries]
+        else:
+            sentences = [entry["search"] for entry in entries]
+        if not sentences:
+            continue
+        # 지식 문장 자체와 교실 질문 예시를 질문으로 사용
+        questions = sentences[:200] + SAMPLE_QUESTIONS
+        reports[name] = {"model": model_name, "backend": args.backend, **agreement(reference, candidate, sentences, questions)}
+        print(f"{name} ({model_name}): 1등 일치율 {reports[name]['top1_agreement']:.1%}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(reports, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.output}")
@@ -0,0 +1,114 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# 캐시 크기와 유효 시간(초)은 환경 변수로 조정
+CACHE_SIZE = int(os.environ.get("EDU_CHATBOT_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.environ.get("EDU_CHATBOT_CACHE_TTL", "3600"))
+
+
+# 질문 정규화: 한글 NFC 정규화, 공백/문장부호 제거, 영문 소문자
+#   "부산 인구?" 와 "부산인구" 는 같은 키가 됨
+def normalize_question(text):
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"[\W_]+", "", text).lower()
+
+
+class CacheEntry:
+    __slots__ = ("vector", "answers", "expires")
+
+    def __init__(self, expires):
+        self.vector = None
+        self.answers = {}
+        self.expires = expires
+
+
+# (모델 이름, 정규화된 질문) -> 질문 벡터 + 최종 답변을 담는 LRU 캐시
+class QueryCache:
+    def __init__(self, max_size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.vector_hits = 0
+        self.vector_misses = 0
+        self.answer_hits = 0
+        self.answer_misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _entry(self, key):
+        entry = self._lookup(key)
+        if entry is None:
+            entry = CacheEntry(time.monotonic() + self.ttl)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_vector(self, model_name, question):
+        key = (model_name, normalize_question(question))
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None or entry.vector is None:
+                self.vector_misses += 1
+                return None
+            self.vector_hits += 1
+            return entry.vector
+
+    def put_vector(self, model_name, question, vector):
+        key = (model_name, normalize_question(question))
+        with self._lock:
+            self._entry(key).vector = vector
+
+    # answer_key: 같은 모델을 쓰는 컬렉션/필터를 구분하는 값
+    def get_answer(self, model_name, question, answer_key):
+        key = (model_name, normalize_question(question))
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None or answer_key not in entry.answers:
+                self.answer_misses += 1
+                return None
+            self.answer_hits += 1
+            return entry.answers[answer_key]
+
+    def put_answer(self, model_name, question, answer_key, answer):
+        key = (model_name, normalize_question(question))
+        with self._lock:
+            self._entry(key).answers[answer_key] = answer
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.vector_hits = self.vector_misses = 0
+            self.answer_hits = self.answer_misses = 0
+
+    def stats(self):
+        with self._lock:
+            vector_total = self.vector_hits + self.vector_misses
+            answer_total = self.answer_hits + self.answer_misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "vector_hits": self.vector_hits,
+                "vector_misses": self.vector_misses,
+                "vector_hit_rate": self.vector_hits / vector_total if vector_total else 0.0,
+                "answer_hits": self.answer_hits,
+                "answer_misses": self.answer_misses,
+                "answer_hit_rate": self.answer_hits / answer_total if answer_total else 0.0,
+            }
+
+
+# 프로세스 전체에서 함께 쓰는 캐시
+QUERY_CACHE = QueryCache()
@@ -0,0 +1,213 @@
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import numpy as np
+
+from lexical_index import char_ngrams
+from tracing import METRICS
+
+# 2단계 재정렬: "" 이면 끔, "lexical"이면 글자 n-gram 겹침, 그 밖의 값은 CrossEncoder 모델 이름
+#   예: EDU_CHATBOT_RERANKER=lexical, EDU_CHATBOT_RERANKER=Dongjin-kr/ko-reranker
+RERANKER = os.environ.get("EDU_CHATBOT_RERANKER", "")
+# 1단계(FAISS + BM25)에서 가져와 다시 점수를 매길 후보 수
+RERANK_CANDIDATES = int(os.environ.get("EDU_CHATBOT_RERANK_CANDIDATES", "10"))
+# 질문 하나에 재정렬이 쓸 수 있는 시간(ms): 넘으면 1단계 순서를 그대로 씀
+RERANK_BUDGET_MS = float(os.environ.get("EDU_CHATBOT_RERANK_BUDGET_MS", "80"))
+# 글자 겹침 점수에 곱하는 가중치 (1단계 코사인 유사도에 더함)
+LEXICAL_WEIGHT = 0.5
+# 지연 시간 통계에 남기는 최근 호출 수
+LATENCY_WINDOW = 1000
+
+# 살아 있는 재정렬기 (fork한 자식 프로세스에서 작업 스레드 풀을 새로 만들기 위해)
+_rerankers = weakref.WeakSet()
+
+
+# 질문의 글자 n-gram 중 후보 문장에 있는 비율 + 1단계 유사도 (모델 없이 빠름)
+class LexicalScorer:
+    name = "lexical"
+
+    def load(self):
+        pass
+
+    def scores(self, question, hits):
+        grams = Counter(char_ngrams(question))
+        total = sum(grams.values()) or 1
+        result = []
+        for similarity, doc in hits:
+            doc_grams = Counter(char_ngrams(doc["search"]))
+            overlap = sum(min(count, doc_grams[gram]) for gram, count in grams.items())
+            result.append(similarity + LEXICAL_WEIGHT * overlap / total)
+        return result
+
+
+# (질문, 후보 문장) 쌍을 함께 읽는 CrossEncoder (처음 쓸 때 불러옴)
+class CrossEncoderScorer:
+    def __init__(self, model_name):
+        self.name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                self._model = CrossEncoder(self.name, device="cpu")
+        return self._model
+
+    def scores(self, question, hits):
+        model = self.load()
+        return model.predict([(question, doc["search"]) for _, doc in hits], convert_to_numpy=True)
+
+
+# 시간 제한이 있는 재정렬: 점수 계산은 작업 스레드에서 하고 budget_ms 안에 끝나지 않으면
+#   1단계 순서를 그대로 돌려줌 (처음 모델을 불러오는 동안도 1단계 순서)
+#   이미 돌고 있는 계산은 멈출 수 없으므로, 앞 계산이 아직 끝나지 않았으면 새로 맡기지 않고 바로 1단계 순서
+#   (느린 계산 하나 뒤에 다음 질문들이 줄 서서 모두 시간 초과되지 않도록)
+#   결과의 점수는 1단계 코사인 유사도 그대로라서 보정한 기준값(threshold)과 비교할 수 있음
+class Reranker:
+    def __init__(self, scorer, budget_ms=RERANK_BUDGET_MS, candidates=RERANK_CANDIDATES):
+        self.scorer = scorer
+        self.budget = budget_ms / 1000
+        self.candidates = candidates
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.busy = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+        self._inflight = None
+        _rerankers.add(self)
+
+    @property
+    def name(self):
+        return self.scorer.name
+
+    # 모델 미리 불러오기 (백그라운드 로더에서 호출)
+    def load(self):
+        self.scorer.load()
+
+    # [(유사도, 항목)] -> 재정렬한 [(유사도, 항목)]
+    def rerank(self, question, hits):
+        if len(hits) < 2:
+            return hits
+        started = time.perf_counter()
+        with self._lock:
+            if self._inflight is not None and not self._inflight.done():
+                future = None
+            else:
+                future = self._inflight = self._executor.submit(self.scorer.scores, question, hits)
+        if future is None:
+            self._record(started, busy=True)
+            return hits
+        try:
+            scores = future.result(timeout=self.budget)
+        except TimeoutError:
+            self._record(started, timeout=True)
+            return hits
+        except Exception:
+            self._record(started, error=True)
+            return hits
+        self._record(started)
+        order = np.argsort(-np.asarray(scores, dtype=np.float32), kind="stable")
+        return [hits[i] for i in order]
+
+    def _record(self, started, timeout=False, error=False, busy=False):
+        with self._lock:
+            self.calls += 1
+            self.timeouts += timeout
+            self.errors += error
+            self.busy += busy
+            self._latencies.append((time.perf_counter() - started) * 1000)
+        if timeout or error or busy:
+            reason = "timeout" if timeout else "busy" if busy else "error"
+            METRICS.inc("chatbot_rerank_fallbacks_total", {"reason": reason}, help="재정렬을 못 하고 1단계 순서를 쓴 수")
+
+    def stats(self):
+        with self._lock:
+            latencies = np.array(self._latencies, dtype=np.float64)
+            calls, timeouts, errors, busy = self.calls, self.timeouts, self.errors, self.busy
+        percentiles = np.percentile(latencies, [50, 95, 99]) if len(latencies) else [0.0, 0.0, 0.0]
+        return {
+            "reranker": self.name,
+            "budget_ms": self.budget * 1000,
+            "calls": calls,
+            "timeouts": timeouts,
+            "errors": errors,
+            "busy": busy,
+            "fallback_rate": (timeouts + errors + busy) / calls if calls else 0.0,
+            "p50_ms": float(percentiles[0]),
+            "p95_ms": float(percentiles[1]),
+            "p99_ms": float(percentiles[2]),
+        }
+
+
+def _restart_after_fork():
+    for reranker in list(_rerankers):
+        reranker._lock = threading.Lock()
+        reranker._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+        reranker._inflight = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def make_reranker(spec=RERANKER, budget_ms=RERANK_BUDGET_MS, candidates=RERANK_CANDIDATES):
+    if not spec:
+        return None
+    scorer = LexicalScorer() if spec == "lexical" else CrossEncoderScorer(spec)
+    return Reranker(scorer, budget_ms, candidates)
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+# 설정한 재정렬기 (프로세스당 하나, 끄면 None)
+def get_reranker():
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None and RERANKER:
+            _reranker = make_reranker()
+        return _reranker
+
+
+# 사용 예: python reranker.py [calibration_questions.jsonl] [lexical|모델 이름]
+#   보정 질문으로 재정렬 전/후 1등 정답률과 질문당 지연 시간 비교
+if __name__ == "__main__":
+    import json
+
+    from retrieval_engine import get_engine
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "calibration_questions.jsonl"
+    reranker = make_reranker(sys.argv[2] if len(sys.argv) > 2 else (RERANKER or "lexical"))
+    reranker.load()
+    with open(path, "r", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    engine = get_engine()
+    for name in dict.fromkeys(row["collection"] for row in rows):
+        collection = engine.collection(name)
+        positions = {id(entry): i for i, entry in enumerate(collection.entries)}
+        questions = [row for row in rows if row["collection"] == name]
+        for label, stage in (("1단계", None), (reranker.name, reranker)):
+            collection.reranker = stage
+            correct = 0
+            latencies = []
+            for row in questions:
+                started = time.perf_counter()
+                hits = collection.search(row["question"], k=1)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if hits:
+                    doc = hits[0][1]
+                    correct += (doc["parent"] if "parent" in doc else positions[id(doc)]) == row["answer_id"]
+            p50, p95 = np.percentile(latencies, [50, 95])
+            print(f"{name:18s} {label:24s} 정답 {correct}/{len(questions)}  p50 {p50:.1f} ms  p95 {p95:.1f} ms")
+    print(reranker.stats())
@@ -0,0 +1,574 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from chunking import chunk_entries
+from fact_store import load_facts
+from faiss_store import content_key, load_calibration, load_or_build_index, search_subset, update_index
+from heritage_embeddings import HERITAGE_FILE, HERITAGE_MODEL, heritage_sentence, load_heritage_embeddings, score_heritage
+from heritage_filters import HeritageIndex
+from heritage_store import load_heritage_table
+from keyword_router import load_router
+from lexical_index import BM25Index, rrf, rrf_scores
+from micro_batch import BatchingEncoder
+from onnx_encoder import DEFAULT_BACKEND, load_encoder, model_key
+from query_cache import QUERY_CACHE
+from reranker import get_reranker
+from selection import MMR_POOL, mmr, sample, select, top_k
+from tracing import METRICS, annotate, cache_result, request, span
+from vector_cache import entry_ids
+
+FALLBACK_ANSWER = "잘 이해되지 않아요. 다시 질문해 주세요!"
+# 가장 낮은 코사인 유사도 (이 값을 기준값으로 쓰면 아무 답도 거절하지 않음)
+DEFAULT_MIN_SIMILARITY = -1.0
+# 보정하지 않은 컬렉션의 모델별 기본 기준값 (확실히 관계없는 질문만 거절하도록 낮게 잡음)
+#   ko-sbert-sts는 STS로 학습해서 관계없는 문장끼리 유사도가 0 근처, bert-kor-base는 평균 풀링이라
+#   모든 문장 쌍의 유사도가 높게 몰려 있어 기준값도 높음. 목록에 없는 모델은 거절하지 않음
+#   python calibrate.py 로 컬렉션/모델별 기준값을 구해 인덱스 옆에 저장하면 그 값을 씀
+MODEL_MIN_SIMILARITY = {
+    "jhgan/ko-sbert-sts": 0.3,
+    "kykim/bert-kor-base": 0.6,
+}
+# 키워드로 바로 찾은 답(_exact_hit)에 붙이는 유사도: 인코더를 건너뛰어 코사인 유사도가 없으므로
+#   기준값과 비교하지 않고 언제나 받아들임 (accepts 참고)
+EXACT_HIT_SIMILARITY = 1.0
+
+# 동시에 들어온 질문 인코딩을 모으는 시간(ms)과 최대 배치 크기 (0이면 모으지 않음)
+BATCH_WINDOW_MS = float(os.environ.get("EDU_CHATBOT_BATCH_WINDOW_MS", "5"))
+BATCH_MAX_SIZE = int(os.environ.get("EDU_CHATBOT_BATCH_MAX_SIZE", "32"))
+
+# 글자 n-gram BM25와 FAISS 결과를 합쳐서 검색 (0이면 FAISS만)
+HYBRID = os.environ.get("EDU_CHATBOT_HYBRID", "1") != "0"
+# 합칠 때 FAISS에서 가져오는 후보 수
+DENSE_CANDIDATES = 50
+
+# 컬렉션 설정: 이름 -> 지식 파일, 파일 형식, 사용할 모델
+#   lines: 한 줄에 한 문장 / search_full: [{"search", "full"}] JSON / heritage: 문화유산 JSON
+#   "backend": "onnx-int8" 처럼 챗봇마다 인코더 백엔드를 따로 정할 수 있음
+#   "rules": 키워드 라우팅 규칙 파일 (맞는 질문은 모델 없이 바로 답변, keyword_router.py 참고)
+#   "chunk": 긴 문단을 문장/항목 조각으로 나눠 조각 단위로 검색 (chunking.py 참고)
+#   "facts": 수치 사실 표 설정 파일 ("해운대구 인구" 같은 질문은 표에서 바로 답변, fact_store.py 참고)
+COLLECTIONS = {
+    "energy2": {"path": "energy2.txt", "format": "lines", "model": "kykim/bert-kor-base", "rules": "energy2_rules.json"},
+    "energy3": {"path": "energy3.txt", "format": "lines", "model": "jhgan/ko-sbert-sts", "rules": "energy3_rules.json", "chunk": True, "facts": "energy3_facts.json"},
+    "busan": {"path": "busan_json.txt", "format": "search_full", "model": "jhgan/ko-sbert-sts", "rules": "busan_rules.json"},
+    "jeju_busan": {"path": "jeju_busan_json.txt", "format": "search_full", "model": "jhgan/ko-sbert-sts", "rules": "jeju_busan_rules.json"},
+    "jeju_busan2": {"path": "jeju_busan_json2.txt", "format": "search_full", "model": "jhgan/ko-sbert-sts", "rules": "jeju_busan2_rules.json"},
+    "population_busan": {"path": "population_busan.txt", "format": "lines", "model": "kykim/bert-kor-base", "rules": "population_busan_rules.json", "chunk": True, "facts": "population_busan_facts.json"},
+    "knowledge": {"path": "knowledge.txt", "format": "lines", "model": "jhgan/ko-sbert-sts", "rules": "knowledge_rules.json"},
+    "knowledge_kykim": {"path": "knowledge.txt", "format": "lines", "model": "kykim/bert-kor-base"},
+    "total": {"path": "total.txt", "format": "lines", "model": "jhgan/ko-sbert-sts", "facts": "total_facts.json"},
+    "heritage": {"path": HERITAGE_FILE, "format": "heritage", "model": HERITAGE_MODEL},
+}
+
+# 프로세스당 모델은 (이름, 백엔드)별로 한 번만 로드
+#   백엔드는 EDU_CHATBOT_BACKEND 또는 컬렉션 설정의 "backend" (torch / onnx / onnx-int8)
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model(model_name, backend=None):
+    key = model_key(model_name, backend or DEFAULT_BACKEND)
+    with _models_lock:
+        if key not in _models:
+            model = load_encoder(model_name, backend or DEFAULT_BACKEND)
+            if BATCH_WINDOW_MS > 0:
+                model = BatchingEncoder(model, BATCH_WINDOW_MS, BATCH_MAX_SIZE)
+            _models[key] = model
+        return _models[key]
+
+
+# 보정 전 기준값 (MODEL_MIN_SIMILARITY, 목록에 없는 모델은 거절하지 않음)
+def default_threshold(model_name):
+    return MODEL_MIN_SIMILARITY.get(model_name, DEFAULT_MIN_SIMILARITY)
+
+
+# 정규화한 질문 벡터 (같은 질문이 다시 오면 캐시에서 꺼내고 인코딩 생략)
+def encode_query(model, model_id, question):
+    vector = QUERY_CACHE.get_vector(model_id, question)
+    cache_result("vector", vector is not None)
+    if vector is None:
+        with span("encode"):
+            vector = np.asarray(model.encode([question], convert_to_numpy=True, normalize_embeddings=True)[0], dtype=np.float32)
+        QUERY_CACHE.put_vector(model_id, question, vector)
+    return vector
+
+
+# 지식 파일 읽기 -> [{"search": 검색 문장, "full": 답변}] (문화유산은 항목 그대로)
+def load_entries(path, fmt):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        if fmt == "lines":
+            return [{"search": line.strip(), "full": line.strip()} for line in f if line.strip()]
+        return json.load(f)
+
+
+# 문화유산 답변 카드
+def heritage_card(item, score):
+    return f"""
+### 🏷️ {item['이름']}
+- 📍 주소: {item['주소']}
+- 📜 시대: {item.get('시대', '정보 없음')}
+- 🏛️ 종류: {item.get('종류', '정보 없음')}
+- 📅 지정 날짜: {item.get('지정날짜', '정보 없음')}
+- 📐 수량/면적: {item.get('수량/면적', '정보 없음')}
+- 👤 소유자: {item.get('소유자', '정보 없음')}
+- 🛠️ 관리자: {item.get('관리자', '정보 없음')}
+- 🔍 유사도 점수: `{score:.2f}`
+"""
+
+
+# 문장 컬렉션: FAISS 코사인 유사도 검색 + 글자 n-gram BM25 (유사도가 클수록 가까움)
+#   두 순위를 RRF로 합치고, 확실한 키워드 일치는 인코더 없이 바로 돌려줌 (유사도 EXACT_HIT_SIMILARITY)
+#   1등 유사도가 기준값(threshold, 보정한 값 또는 모델별 기본값)보다 낮으면 fallback 답변
+#   chunk면 긴 문단(entries)을 조각(docs)으로 나눠 색인하고, 조각은 "parent"로 원래 문단 번호를 가리킴
+#   ids는 언제나 원래 문단 번호 (규칙 파일과 같은 번호)
+#   재정렬기(reranker.py)를 켜면 1단계 상위 후보를 다시 점수 매겨 순서만 바꿈 (시간 안에 못 끝내면 1단계 순서)
+#   FAISS 안의 번호는 문장 내용으로 만든 고정 번호(faiss_ids)라서 previous(예전 컬렉션)를 주면
+#   바뀐 문장만 지우고 더해 인덱스를 고침
+class Collection:
+    def __init__(self, name, model_name, entries, backend=None, chunk=False, previous=None):
+        self.name = name
+        self.model_name = model_name
+        self.model_id = model_key(model_name, backend or DEFAULT_BACKEND)
+        self.entries = entries
+        self.docs = chunk_entries(entries) if chunk else entries
+        self.parents = np.array([doc.get("parent", i) for i, doc in enumerate(self.docs)], dtype=np.int64)
+        self.model = get_model(model_name, backend)
+        searches = [doc["search"] for doc in self.docs]
+        self.faiss_ids = entry_ids(searches)
+        self.positions = {int(faiss_id): i for i, faiss_id in enumerate(self.faiss_ids)}
+        # 답변 캐시에 함께 넣어 지식 파일이 바뀌면 예전 답을 쓰지 않게 함
+        self.version = content_key(searches, self.model_id)
+        if previous is not None and previous.model_id == self.model_id:
+            old_searches = [doc["search"] for doc in previous.docs]
+            self.index, _ = update_index(previous.index, old_searches, self.model, self.model_id, searches, corpus=name)
+        else:
+            self.index, _ = load_or_build_index(self.model, self.model_id, searches, corpus=name)
+        self.lexical = BM25Index(searches)
+        self.calibration = load_calibration(self.model_id, searches)
+        if self.calibration is None and previous is not None and previous.model_id == self.model_id:
+            # 몇 줄 고친 정도로는 유사도 분포가 거의 같으므로 다시 보정할 때까지 예전 기준값 사용
+            self.calibration = previous.calibration
+        self.threshold = self.calibration["threshold"] if self.calibration else default_threshold(model_name)
+        self.reranker = get_reranker()
+
+    # 문단 번호 -> 그 문단의 조각 번호
+    def doc_ids(self, ids):
+        if ids is None or self.docs is self.entries:
+            return ids
+        return np.flatnonzero(np.isin(self.parents, ids))
+
+    # 확실한 키워드 일치면 그 항목 번호 (하나만 찾을 때만 인코더를 건너뜀)
+    def _exact_hit(self, question, k, ids=None):
+        if not HYBRID or k != 1:
+            return None
+        return self.lexical.exact_hit(question, self.lexical.scores(question, ids), ids)
+
+    # 1단계에서 가져올 후보 수 (재정렬하면 k보다 많이)
+    def _candidates(self, k):
+        return max(k, self.reranker.candidates) if self.reranker is not None else k
+
+    # FAISS 후보와 BM25 순위를 합쳐 상위 k개 -> [(유사도, 항목)]
+    #   BM25에만 있는 항목은 FAISS 후보 중 가장 낮은 유사도로 둠
+    def _fuse(self, question, d_row, i_row, k, ids=None):
+        dense = [(float(d), self.positions[int(i)]) for d, i in zip(d_row, i_row) if i >= 0]
+        n = self._candidates(k)
+        if not HYBRID:
+            hits = [(d, self.docs[i]) for d, i in dense[:n]]
+        else:
+            similarities = {i: d for d, i in dense}
+            worst = min(similarities.values(), default=DEFAULT_MIN_SIMILARITY)
+            lexical = self.lexical.ranking(self.lexical.scores(question, ids), ids)
+            fused = rrf([[i for _, i in dense], lexical])[:n]
+            hits = [(similarities.get(i, worst), self.docs[i]) for i in fused]
+        if self.reranker is not None:
+            with span("rerank"):
+                hits = self.reranker.rerank(question, hits)
+        return hits[:k]
+
+    # ids(문단 번호)를 주면 그 문단들 안에서만 검색 -> [(유사도, 조각 또는 항목)]
+    def search(self, question, k=1, ids=None):
+        size = self.index.ntotal
+        if ids is not None:
+            ids = np.asarray(self.doc_ids(ids), dtype=np.int64)
+            if len(ids) == 0:
+                return []
+            size = len(ids)
+        if size == 0:
+            return []
+        with span("lexical_shortcut"):
+            hit = self._exact_hit(question, k, ids)
+        if hit is not None:
+            annotate(shortcut=True)
+            return [(EXACT_HIT_SIMILARITY, self.docs[hit])]
+
+        k = min(k, size)
+        query_vec = encode_query(self.model, self.model_id, question)
+        dense_k = min(max(k, DENSE_CANDIDATES) if HYBRID else self._candidates(k), size)
+        with span("index_search"):
+            if ids is None:
+                D, I = self.index.search(query_vec.reshape(1, -1), dense_k)
+            else:
+                D, I = search_subset(self.index, query_vec.reshape(1, -1), self.faiss_ids[ids], dense_k)
+        with span("fuse"):
+            return self._fuse(question, D[0], I[0], k, ids)
+
+    # 여러 질문을 한 번에: 키워드로 바로 찾은 질문은 빼고, 나머지는 큰 배치로 인코딩해 질문 행렬 전체를 한 번에 검색
+    def search_batch(self, questions, k=1, batch_size=256):
+        if not questions or self.index.ntotal == 0:
+            return [[] for _ in questions]
+        results = [None] * len(questions)
+        for i, question in enumerate(questions):
+            hit = self._exact_hit(question, k)
+            if hit is not None:
+                results[i] = [(EXACT_HIT_SIMILARITY, self.docs[hit])]
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            with span("encode"):
+                query_vecs = self.model.encode([questions[i] for i in missing], convert_to_numpy=True, normalize_embeddings=True, batch_size=batch_size)
+            k = min(k, self.index.ntotal)
+            dense_k = min(max(k, DENSE_CANDIDATES) if HYBRID else self._candidates(k), self.index.ntotal)
+            with span("index_search"):
+                D, I = self.index.search(np.ascontiguousarray(query_vecs, dtype=np.float32), dense_k)
+            for i, d_row, i_row in zip(missing, D, I):
+                results[i] = self._fuse(questions[i], d_row, i_row, k)
+        return results
+
+    # 1등을 답으로 보여줄지: 기준값 이상이거나 키워드로 바로 찾은 답 (이 경우 기준값을 보지 않음)
+    def accepts(self, hits):
+        return bool(hits) and (hits[0][0] >= self.threshold or hits[0][0] == EXACT_HIT_SIMILARITY)
+
+    # 찾은 조각의 답변 (context면 원래 문단 전체도 함께)
+    def answer_text(self, doc, context=False):
+        if context and "parent" in doc and doc["full"] != self.entries[doc["parent"]]["full"]:
+            return f"{doc['full']}\n\n> {self.entries[doc['parent']]['full']}"
+        return doc["full"]
+
+    def _answer_key(self, ids, fallback, context):
+        return (self.name, self.version, None if ids is None else tuple(ids), fallback, context)
+
+    # 캐시에 있는 답변만 (없으면 None, 검색하지 않음)
+    def cached_answer(self, question, ids=None, fallback=FALLBACK_ANSWER, context=False):
+        return QUERY_CACHE.get_answer(self.model_id, question, self._answer_key(ids, fallback, context))
+
+    def answer(self, question, ids=None, fallback=FALLBACK_ANSWER, context=False):
+        annotate(collection=self.name, model=self.model_id)
+        cached = self.cached_answer(question, ids, fallback, context)
+        cache_result("answer", cached is not None)
+        if cached is not None:
+            return cached
+
+        results = self.search(question, k=1, ids=ids)
+        answer = self.answer_text(results[0][1], context) if self.accepts(results) else fallback
+        annotate(accepted=self.accepts(results))
+        QUERY_CACHE.put_answer(self.model_id, question, self._answer_key(ids, fallback, context), answer)
+        return answer
+
+    # 동시에 들어온 질문들을 한 번에 답변 (캐시에 없는 질문만 배치 검색)
+    def answer_batch(self, questions, fallback=FALLBACK_ANSWER):
+        answer_key = (self.name, self.version, None, fallback, False)
+        answers = [QUERY_CACHE.get_answer(self.model_id, q, answer_key) for q in questions]
+        missing = [i for i, a in enumerate(answers) if a is None]
+        if missing:
+            results = self.search_batch([questions[i] for i in missing], k=1)
+            for i, hits in zip(missing, results):
+                answers[i] = hits[0][1]["full"] if self.accepts(hits) else fallback
+                QUERY_CACHE.put_answer(self.model_id, questions[i], answer_key, answers[i])
+        return answers
+
+
+# 문화유산 컬렉션: 미리 계산한 임베딩 행렬로 코사인 유사도 (클수록 가까움) + 글자 n-gram BM25
+#   순위는 두 점수를 RRF로 합쳐 정하고, 보여주는 점수는 코사인 유사도 (키워드로 바로 찾으면 EXACT_HIT_SIMILARITY)
+class HeritageCollection:
+    def __init__(self, name, model_name, entries, path=HERITAGE_FILE, backend=None):
+        self.name = name
+        self.model_name = model_name
+        self.model_id = model_key(model_name, backend or DEFAULT_BACKEND)
+        self.entries = entries
+        self.model = get_model(model_name, backend)
+        self.embeddings = load_heritage_embeddings(self.model, self.model_id, path, entries)
+        self.filters = HeritageIndex(entries)
+        self.lexical = BM25Index([heritage_sentence(item) for item in entries])
+
+    def score(self, question, ids):
+        query_vec = encode_query(self.model, self.model_id, question)
+        with span("heritage_score"):
+            return score_heritage(self.embeddings, query_vec, ids)
+
+    def _exact_hit(self, question, ids):
+        if not HYBRID:
+            return None
+        return self.lexical.exact_hit(question, self.lexical.scores(question, ids), ids)
+
+    # ids 안에서 순위를 정할 점수 (HYBRID면 RRF 점수, 아니면 코사인 유사도)
+    def _rank_scores(self, question, ids, scores):
+        if not HYBRID:
+            return scores
+        return rrf_scores(scores, self.lexical.scores(question, ids))
+
+    def search(self, question, k=1, ids=None):
+        if ids is None:
+            ids = np.arange(len(self.entries))
+        if len(ids) == 0:
+            return []
+        if k == 1:
+            hit = self._exact_hit(question, ids)
+            if hit is not None:
+                return [(EXACT_HIT_SIMILARITY, self.entries[hit])]
+        scores = self.score(question, ids)
+        top = top_k(self._rank_scores(question, ids, scores), k)
+        return [(float(scores[j]), self.entries[ids[j]]) for j in top]
+
+    def search_batch(self, questions, k=1, batch_size=256):
+        if not questions or len(self.entries) == 0:
+            return [[] for _ in questions]
+        query_vecs = self.model.encode(list(questions), convert_to_numpy=True, normalize_embeddings=True, batch_size=batch_size)
+        scores = np.asarray(query_vecs, dtype=np.float32) @ np.asarray(self.embeddings).T
+        k = min(k, scores.shape[1])
+        all_ids = np.arange(len(self.entries))
+        results = []
+        for question, row in zip(questions, scores):
+            ids = top_k(self._rank_scores(question, all_ids, row), k)
+            results.append([(float(row[i]), self.entries[i]) for i in ids])
+        return results
+
+    # ids(항목 번호) 안에서 k개 고르기 -> [(항목 번호, 유사도)] (selection.py)
+    #   기본: 가장 높은 순위 점수 (같은 점수끼리만 무작위)
+    #   temperature > 0: 순위 상위 pool개 안에서 softmax(유사도 / temperature)로 뽑기 (inf면 균등)
+    #   diversity > 0: MMR로 이미 보여준 항목(shown_ids)이나 먼저 고른 항목과 덜 비슷한 항목 위주
+    def pick(self, question, ids, k=1, temperature=0.0, diversity=0.0, pool=None, shown_ids=()):
+        ids = np.asarray(ids, dtype=np.int64)
+        scores = self.score(question, ids)
+        rank_scores = self._rank_scores(question, ids, scores)
+        if diversity > 0:
+            # 관련성은 코사인 유사도로 봄 (RRF 점수는 차이가 너무 작음)
+            candidates = top_k(rank_scores, max(k, pool or MMR_POOL))
+            seen = np.asarray(self.embeddings[sorted(shown_ids)]) if shown_ids else None
+            picked = candidates[mmr(scores[candidates], np.asarray(self.embeddings[ids[candidates]]), k, diversity, seen)]
+        elif temperature > 0:
+            candidates = top_k(rank_scores, pool or len(ids))
+            picked = candidates[sample(scores[candidates], k, temperature)]
+        else:
+            picked = select(rank_scores, k)
+        return [(int(ids[j]), float(scores[j])) for j in picked]
+
+    # 질문 조건(종류/지역/시대)으로 거른 뒤 항목 하나 고르기 (고르는 방법은 pick 참고)
+    #   이미 보여준 항목은 제외 마스크로 빼고 거름 (exclude를 주면 shown_ids 대신 그 마스크 사용)
+    #   -> (항목 번호, 점수) 또는 None
+    def recommend(self, question, shown_ids=(), type_keywords=("유형", "무형"), exclude=None, temperature=0.0, diversity=0.0):
+        annotate(collection=self.name, model=self.model_id)
+        with span("heritage_filter"):
+            type_keyword, districts, era = self.filters.parse_question(question, type_keywords)
+            if exclude is None:
+                exclude = self.filters.exclude_mask(shown_ids)
+            ids = self.filters.filter(type_keyword, districts, era, exclude=exclude)
+        annotate(candidates=len(ids))
+        if len(ids) == 0:
+            return None
+        hit = self._exact_hit(question, ids)
+        if hit is not None:
+            return hit, EXACT_HIT_SIMILARITY
+        if diversity > 0 and not shown_ids:
+            shown_ids = np.flatnonzero(exclude).tolist()
+        return self.pick(question, ids, 1, temperature, diversity, shown_ids=shown_ids)[0]
+
+    def answer(self, question, ids=None, fallback="조건에 맞는 문화유산을 찾을 수 없습니다."):
+        results = self.search(question, k=1, ids=ids)
+        if not results:
+            return fallback
+        score, item = results[0]
+        return heritage_card(item, score)
+
+
+# 지식 파일 수정 시각 (코드 안의 문장 목록이나 없는 파일은 None)
+def data_mtime(spec):
+    path = spec.get("path")
+    if path is None or not os.path.exists(path):
+        return None
+    return os.path.getmtime(path)
+
+
+# 여러 컬렉션을 한 프로세스에서 제공 (처음 쓸 때 로드)
+#   지식 파일이 바뀌면 다음 질문 때 새 컬렉션을 만들어 바꿔 끼움 (재시작 불필요)
+#   새 컬렉션은 바뀐 문장만 인코딩하고, 그동안 들어온 질문은 예전 컬렉션으로 답함
+class RetrievalEngine:
+    def __init__(self, collections=COLLECTIONS):
+        self.specs = dict(collections)
+        self._loaded = {}
+        self._mtimes = {}
+        self._routers = {}
+        self._facts = {}
+        self._lexical = {}
+        self._build_locks = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        return list(self.specs)
+
+    # 파일이 없는 지식(코드 안의 문장 목록)을 컬렉션으로 등록
+    def add_collection(self, name, model_name, sentences, facts=None):
+        self.specs[name] = {"sentences": list(sentences), "format": "lines", "model": model_name}
+        if facts:
+            self.specs[name]["facts"] = facts
+        with self._lock:
+            self._loaded.pop(name, None)
+        self._facts.pop(name, None)
+
+    # 컬렉션 만들기(모델 로드, 인코딩)는 엔진 전체 잠금 밖에서 컬렉션마다 따로 잠그고 함
+    #   다시 만드는 중이면 다른 스레드는 기다리지 않고 예전 컬렉션을 받음 (처음 만들 때만 기다림)
+    def collection(self, name):
+        spec = self.specs[name]
+        mtime = data_mtime(spec)
+        with self._lock:
+            current = self._loaded.get(name)
+            if current is not None and self._mtimes.get(name) == mtime:
+                return current
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+        if not build_lock.acquire(blocking=current is None):
+            return current
+        try:
+            with self._lock:
+                previous = self._loaded.get(name)
+                if previous is not None and self._mtimes.get(name) == mtime:
+                    return previous
+            if "sentences" in spec:
+                entries = [{"search": s, "full": s} for s in spec["sentences"]]
+            elif spec["format"] == "heritage" and os.path.exists(spec["path"]):
+                # 문화유산은 열 저장 표를 메모리 매핑으로 읽음 (heritage_store.py)
+                entries = load_heritage_table(spec["path"])
+            else:
+                entries = load_entries(spec["path"], spec["format"])
+            with span("load_collection"):
+                if spec["format"] == "heritage":
+                    built = HeritageCollection(name, spec["model"], entries, spec["path"], spec.get("backend"))
+                else:
+                    built = Collection(name, spec["model"], entries, spec.get("backend"), spec.get("chunk", False), previous)
+            with self._lock:
+                self._loaded[name] = built
+                self._mtimes[name] = mtime
+            return built
+        finally:
+            build_lock.release()
+
+    # 이미 불러온 컬렉션 (아직 불러오는 중이거나 안 불렀으면 None, 기다리지 않음)
+    def loaded(self, name):
+        return self._loaded.get(name)
+
+    # 컬렉션 이름 또는 지식 파일 이름(예: energy3.txt)으로 컬렉션 찾기
+    def resolve(self, target):
+        if target in self.specs:
+            return target
+        names = [name for name, spec in self.specs.items() if "path" in spec and os.path.basename(spec["path"]) == os.path.basename(target)]
+        # 같은 지식 파일을 다른 모델로 쓰는 컬렉션이 여럿이면 (예: knowledge.txt) 컬렉션 이름으로 골라야 함
+        if len(names) > 1:
+            raise KeyError(f"{target}을(를) 쓰는 컬렉션이 여럿입니다. 컬렉션 이름으로 골라 주세요: {', '.join(names)}")
+        if names:
+            return names[0]
+        raise KeyError(f"알 수 없는 컬렉션입니다: {target}")
+
+    # 키워드 라우터 (모델 없이 지식 파일과 규칙 파일만 읽음, 둘 중 하나를 고치면 다음 질문부터 반영)
+    def router(self, name):
+        spec = self.specs[name]
+        path = spec.get("rules")
+        if not path or not os.path.exists(path):
+            return None
+        mtime = (os.path.getmtime(path), data_mtime(spec))
+        cached = self._routers.get(name)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, load_router(path, self.spec_entries(spec)))
+            self._routers[name] = cached
+        return cached[1]
+
+    def spec_entries(self, spec):
+        if "sentences" in spec:
+            return [{"search": s, "full": s} for s in spec["sentences"]]
+        return load_entries(spec["path"], spec["format"])
+
+    # 수치 사실 표 (모델 없이 지식 파일과 사실 설정 파일만 읽음, 둘 중 하나를 고치면 다음 질문부터 반영)
+    def facts(self, name):
+        spec = self.specs[name]
+        path = spec.get("facts")
+        if not path or not os.path.exists(path):
+            return None
+        mtime = (os.path.getmtime(path), data_mtime(spec))
+        cached = self._facts.get(name)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, load_facts(path, self.spec_entries(spec)))
+            self._facts[name] = cached
+        return cached[1]
+
+    # 글자 n-gram BM25 색인과 검색 단위(조각 또는 항목) 목록 (모델 없이 지식 파일만 읽음)
+    #   컬렉션을 불러왔으면 그 색인을 그대로 쓰고, 아니면 따로 만들어 둠 (모델을 불러오는 동안 첫 후보용)
+    def lexical(self, name):
+        spec = self.specs[name]
+        mtime = data_mtime(spec)
+        collection = self._loaded.get(name)
+        if isinstance(collection, Collection) and self._mtimes.get(name) == mtime:
+            self._lexical.pop(name, None)
+            return collection.lexical, collection.docs
+        cached = self._lexical.get(name)
+        if cached is None or cached[0] != mtime:
+            entries = self.spec_entries(spec)
+            docs = chunk_entries(entries) if spec.get("chunk") else entries
+            cached = (mtime, BM25Index([doc["search"] for doc in docs]), docs)
+            self._lexical[name] = cached
+        return cached[1], cached[2]
+
+    # BM25 1등 후보 (ids(문단 번호)를 주면 그 안에서만, 겹치는 글자가 없으면 None)
+    def lexical_candidate(self, name, question, ids=None):
+        index, docs = self.lexical(name)
+        doc_ids = None
+        if ids is not None:
+            parents = np.array([doc.get("parent", i) for i, doc in enumerate(docs)], dtype=np.int64)
+            doc_ids = np.flatnonzero(np.isin(parents, ids))
+        with span("lexical_candidate"):
+            ranking = index.ranking(index.scores(question, doc_ids), doc_ids)
+        return docs[ranking[0]] if ranking else None
+
+    # 사실 표로 답할 수 있으면 그 답, 규칙에 맞으면 규칙 답변,
+    # 아니면 규칙이 정한 범위(ids)와 fallback으로 검색
+    #   사실 표를 먼저 봄: 규칙 키워드는 글자 그대로 찾아서 "해운대구"의 "대구"처럼 다른 이름 안에서도 맞음
+    #   사실 표는 대상과 항목을 모두 찾았거나 한 종류 안의 순위를 물을 때만 답하고, 나머지는 규칙으로 넘김
+    def route(self, name, question):
+        annotate(collection=name)
+        facts = self.facts(name)
+        if facts is not None:
+            with span("facts"):
+                answer = facts.answer(question)
+            if answer is not None:
+                annotate(route="facts")
+                return {"answer": answer}
+        router = self.router(name)
+        if router is None:
+            annotate(route="search")
+            return {}
+        with span("keyword_route"):
+            route = router.route(question)
+        annotate(route="rule" if "answer" in route else "search")
+        return route
+
+    def answer(self, name, question):
+        with request("answer", collection=name):
+            route = self.route(name, question)
+            if "answer" in route:
+                return route["answer"]
+            return self.collection(name).answer(question, **route)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+# /metrics에 질문 캐시 크기와 적중 수도 함께 내보냄
+METRICS.add_gauges(lambda: {f"chatbot_query_cache_{key}": value for key, value in QUERY_CACHE.stats().items()})
+
+
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RetrievalEngine()
+        return _engine
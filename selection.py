@@ -0,0 +1,91 @@
+import math
+
+import numpy as np
+
+# 최고 점수와 이만큼 이내면 같은 점수로 보고 무작위로 고름
+TIE_TOLERANCE = 1e-6
+# 다양성(MMR)을 계산할 때 살펴보는 상위 후보 수
+MMR_POOL = 50
+
+_rng = np.random.default_rng()
+
+
+# 점수 상위 k개의 위치 (점수 순, argpartition으로 O(N) 후 k개만 정렬, 항목이 k개보다 적어도 됨)
+def top_k(scores, k):
+    scores = np.asarray(scores)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+# 최고 점수 묶음(같은 점수) 안에서만 무작위로 하나 고르기 (정렬 없이 O(N))
+def pick_best(scores, rng=None, tol=TIE_TOLERANCE):
+    scores = np.asarray(scores)
+    if len(scores) == 0:
+        return None
+    ties = np.flatnonzero(scores >= scores.max() - tol)
+    return int(ties[0]) if len(ties) == 1 else int((rng or _rng).choice(ties))
+
+
+# 상위 pool개 안에서 softmax(점수 / temperature) 확률로 k개 뽑기 (중복 없음)
+#   temperature가 0이면 가장 높은 점수(같으면 무작위), inf면 상위 pool개 중 균등하게
+def sample(scores, k=1, temperature=0.0, pool=None, rng=None):
+    scores = np.asarray(scores, dtype=np.float64)
+    rng = rng or _rng
+    if temperature <= 0:
+        if k == 1:
+            best = pick_best(scores, rng)
+            return np.empty(0, dtype=np.int64) if best is None else np.array([best])
+        return top_k(scores, k)
+    candidates = top_k(scores, pool or len(scores))
+    if len(candidates) == 0:
+        return candidates
+    if math.isinf(temperature):
+        weights = np.ones(len(candidates))
+    else:
+        logits = (scores[candidates] - scores[candidates[0]]) / temperature
+        weights = np.exp(logits)
+    return rng.choice(candidates, size=min(k, len(candidates)), replace=False, p=weights / weights.sum())
+
+
+# 최대 한계 관련성(MMR): 점수가 높으면서 이미 고른(또는 보여준, seen) 항목과 덜 비슷한 항목 k개
+#   diversity 0이면 점수 순 그대로, 1에 가까울수록 서로 다른 항목 위주
+#   vectors는 scores와 같은 순서의 정규화된 벡터
+def mmr(scores, vectors, k=1, diversity=0.5, seen=None, pool=MMR_POOL):
+    scores = np.asarray(scores, dtype=np.float32)
+    candidates = top_k(scores, max(k, pool))
+    if len(candidates) == 0:
+        return candidates
+    vectors = np.asarray(vectors[candidates], dtype=np.float32)
+    redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    if seen is not None and len(seen):
+        redundancy = (vectors @ np.asarray(seen, dtype=np.float32).T).max(axis=1)
+    chosen = []
+    available = np.ones(len(candidates), dtype=bool)
+    for _ in range(min(k, len(candidates))):
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        value = np.where(available, (1 - diversity) * scores[candidates] - diversity * penalty, -np.inf)
+        best = int(np.argmax(value))
+        chosen.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, vectors @ vectors[best])
+    return candidates[chosen]
+
+
+# 점수 배열에서 k개 고르기: exclude(같은 길이의 불리언 마스크)는 빼고,
+#   diversity > 0이면 MMR (vectors 필요), 아니면 temperature 샘플링 -> 위치 배열
+def select(scores, k=1, exclude=None, temperature=0.0, diversity=0.0, vectors=None, seen=None, pool=None, rng=None):
+    scores = np.asarray(scores, dtype=np.float32)
+    if exclude is not None:
+        keep = np.flatnonzero(~np.asarray(exclude, dtype=bool))
+        if len(keep) < len(scores):
+            picked = select(scores[keep], k, None, temperature, diversity, None if vectors is None else vectors[keep], seen, pool, rng)
+            return keep[picked]
+    if diversity > 0 and vectors is not None:
+        return mmr(scores, vectors, k, diversity, seen, pool or MMR_POOL)
+    return sample(scores, k, temperature, pool, rng)
@@ -0,0 +1,89 @@
+import asyncio
+
+from answer_client import SERVER_URL, ask
+from answer_server import answer_question
+from retrieval_engine import FALLBACK_ANSWER, HeritageCollection, get_engine
+from tracing import annotate, cache_result, span
+
+# 의미 검색이 끝나기 전에 먼저 보여주는 답 아래에 붙이는 말
+PENDING_NOTE = "🔎 더 알맞은 답을 찾고 있어요..."
+
+
+# 이 프로세스에서 답하는 컬렉션인지 (답변 서버가 없거나, 화면 코드 안의 문장으로 등록한 컬렉션)
+def is_local(engine, name):
+    return not SERVER_URL or "sentences" in engine.specs[name]
+
+
+# 의미 검색 단계: 컬렉션이 준비될 때까지 기다린 뒤 답하기 (답변 서버가 있으면 서버에 질문)
+#   route: 앞에서 구한 라우팅 결과 (이 프로세스에서 답할 때 다시 라우팅하지 않음)
+def dense_answer(engine, name, question, shown_ids=(), route=None):
+    if not is_local(engine, name):
+        return ask(name, question, shown_ids)
+    from lazy_loader import LOADER
+
+    LOADER.wait(name)
+    return answer_question(engine, name, question, shown_ids, route=route)
+
+
+# 질문 하나를 단계별로 답하는 비동기 파이프라인: 라우팅 -> 캐시 -> 키워드 후보 -> 의미 검색
+#   {"stage", "answer", "final", ...}을 차례로 내보냄 (final이면 마지막 답, 문화유산은 ask()와 같은 항목 번호 포함)
+#   규칙/사실 답변과 캐시 적중은 바로 끝나고, 그 밖에는 BM25 1등을 먼저 보여준 뒤 의미 검색 결과로 바꿈
+#   라우팅과 키워드 후보는 모델 없이 지식 파일만 읽으므로 모델을 불러오는 동안에도 바로 나옴
+#   규칙이 정한 검색 범위가 비어 있으면 검색하지 않고 규칙의 fallback으로 끝냄
+#   의미 검색은 작업 스레드에서 돌려서 이벤트 루프를 막지 않음
+#   route: 이미 구한 engine.route 결과 (주면 다시 라우팅하지 않음)
+async def answer_events(name, question, shown_ids=(), engine=None, route=None):
+    engine = engine or get_engine()
+    name = engine.resolve(name)
+    if route is None:
+        route = engine.route(name, question)
+    if "answer" in route:
+        yield {"stage": "route", "answer": route["answer"], "final": True, "routed": True}
+        return
+    if route.get("ids") == []:
+        yield {"stage": "route", "answer": route.get("fallback", FALLBACK_ANSWER), "final": True, "routed": True}
+        return
+
+    collection = engine.loaded(name)
+    if engine.specs[name]["format"] == "heritage":
+        if isinstance(collection, HeritageCollection):
+            type_keyword, districts, era = collection.filters.parse_question(question)
+            count = len(collection.filters.filter(type_keyword, districts, era, exclude=collection.filters.exclude_mask(shown_ids)))
+            if count:
+                yield {"stage": "filter", "answer": f"조건에 맞는 문화유산 {count}곳 중에서 고르고 있어요...", "final": False}
+    else:
+        if collection is not None and is_local(engine, name):
+            cached = collection.cached_answer(question, **route)
+            if cached is not None:
+                cache_result("answer", True)
+                annotate(route="cache")
+                yield {"stage": "cache", "answer": cached, "final": True}
+                return
+        candidate = engine.lexical_candidate(name, question, route.get("ids"))
+        if candidate is not None:
+            yield {"stage": "lexical", "answer": candidate["full"], "final": False}
+
+    result = await asyncio.to_thread(dense_answer, engine, name, question, shown_ids, route)
+    yield {"stage": "dense", **result, "final": True}
+
+
+# Streamlit 자리(placeholder)에 단계별 답을 바꿔 그리고 마지막 결과(dict) 돌려주기
+#   render(답, final) -> 그릴 글 (기본: "**챗봇:** 답", 마지막이 아니면 찾는 중 표시를 붙임)
+#   route: 화면에서 이미 라우팅했으면 그 결과 (answer_events 참고)
+def stream_answer(placeholder, name, question, shown_ids=(), render=None, unsafe_allow_html=False, route=None):
+    def default_render(answer, final):
+        text = f"**챗봇:** {answer}"
+        return text if final else f"{text}\n\n_{PENDING_NOTE}_"
+
+    render = render or default_render
+
+    async def run():
+        final = None
+        async for event in answer_events(name, question, shown_ids, route=route):
+            with span("render"):
+                placeholder.markdown(render(event["answer"], event["final"]), unsafe_allow_html=unsafe_allow_html)
+            if event["final"]:
+                final = event
+        return final
+
+    return asyncio.run(run())
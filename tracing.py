@@ -0,0 +1,288 @@
+import contextvars
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+
+# 질문마다 단계별 시간을 한 줄(JSON)씩 남기는 로그 파일 (비우면 남기지 않음), 크기가 넘치면 돌려 씀
+TRACE_LOG = os.environ.get("EDU_CHATBOT_TRACE_LOG", ".logs/requests.log")
+TRACE_LOG_BYTES = int(os.environ.get("EDU_CHATBOT_TRACE_LOG_BYTES", str(5 * 1024 * 1024)))
+TRACE_LOG_BACKUPS = 3
+# Prometheus 텍스트 형식 지표를 보여줄 포트 (비우면 열지 않음, 답변 서버는 자기 포트의 /metrics로도 보여줌)
+METRICS_PORT = os.environ.get("EDU_CHATBOT_METRICS_PORT", "")
+METRICS_HOST = os.environ.get("EDU_CHATBOT_HOST", "127.0.0.1")
+# 느린 질문 프로파일: "cprofile" 또는 "pyinstrument" (비우면 끔), 이 시간(ms)보다 오래 걸린 질문만 저장
+PROFILE = os.environ.get("EDU_CHATBOT_PROFILE", "")
+PROFILE_THRESHOLD_MS = float(os.environ.get("EDU_CHATBOT_PROFILE_THRESHOLD_MS", "500"))
+PROFILE_DIR = ".profiles"
+# 시간 히스토그램 구간(초)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar("trace", default=None)
+_profile_numbers = itertools.count(1)
+
+
+# 질문 하나의 기록: 단계별 시간(ms)과 컬렉션/모델/캐시 적중 같은 속성
+class Trace:
+    __slots__ = ("kind", "started", "spans", "attrs")
+
+    def __init__(self, kind, attrs):
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.spans = []
+        self.attrs = dict(attrs)
+
+    def to_dict(self, total_ms):
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "kind": self.kind,
+            "total_ms": round(total_ms, 3),
+            **self.attrs,
+            "spans": [[stage, round(ms, 3)] for stage, ms in self.spans],
+        }
+
+
+def label_text(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+# 프로세스 안의 카운터와 시간 히스토그램 (Prometheus 텍스트 형식으로 내보냄)
+class Metrics:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = []
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels=None, value=1, help=""):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._help.setdefault(name, ("counter", help))
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, seconds, help=""):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._help.setdefault(name, ("histogram", help))
+            counts = self._histograms.get(key)
+            if counts is None:
+                counts = self._histograms[key] = [0] * len(self.buckets) + [0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += seconds
+
+    # 내보낼 때마다 값을 읽어 올 함수 (예: 질문 캐시 크기와 적중 수) -> {지표 이름: 값}
+    def add_gauges(self, fn):
+        with self._lock:
+            self._gauges.append(fn)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+            gauges = list(self._gauges)
+            kinds = dict(self._help)
+        written = set()
+
+        def header(name):
+            if name not in written:
+                kind, help = kinds.get(name, ("gauge", ""))
+                if help:
+                    lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                written.add(name)
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append(f"{name}{label_text(dict(labels))} {value}")
+        for (name, labels), counts in histograms:
+            header(name)
+            labels = dict(labels)
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{name}_bucket{label_text({**labels, 'le': bound})} {count}")
+            lines.append(f"{name}_bucket{label_text({**labels, 'le': '+Inf'})} {counts[-2]}")
+            lines.append(f"{name}_count{label_text(labels)} {counts[-2]}")
+            lines.append(f"{name}_sum{label_text(labels)} {counts[-1]:.6f}")
+        for fn in gauges:
+            for name, value in fn().items():
+                header(name)
+                lines.append(f"{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def trace_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None and TRACE_LOG:
+            os.makedirs(os.path.dirname(TRACE_LOG) or ".", exist_ok=True)
+            logger = logging.getLogger("edu_chatbot.trace")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(TRACE_LOG, maxBytes=TRACE_LOG_BYTES, backupCount=TRACE_LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            _logger = logger
+        return _logger
+
+
+# 한 단계 시간 재기: 지표(chatbot_stage_seconds)에 더하고, 질문 기록 안이면 기록에도 남김
+@contextmanager
+def span(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        trace = _current.get()
+        collection = trace.attrs.get("collection", "") if trace is not None else ""
+        METRICS.observe("chatbot_stage_seconds", {"stage": stage, "collection": collection}, seconds, "단계별 처리 시간")
+        if trace is not None:
+            trace.spans.append((stage, seconds * 1000))
+
+
+# 지금 질문 기록에 속성 더하기 (질문 기록 밖이면 무시)
+def annotate(**attrs):
+    trace = _current.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+# 캐시 조회 결과 (지표와 질문 기록에 함께 남김)
+def cache_result(cache, hit):
+    METRICS.inc("chatbot_cache_lookups_total", {"cache": cache, "result": "hit" if hit else "miss"}, help="캐시 조회 수")
+    annotate(**{f"{cache}_cache": "hit" if hit else "miss"})
+
+
+# 느린 질문 프로파일러 (켜져 있지 않거나 다른 프로파일러가 돌고 있으면 None)
+def start_profiler():
+    if PROFILE == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            return None
+        profiler = Profiler()
+    elif PROFILE == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+    else:
+        return None
+    try:
+        if PROFILE == "pyinstrument":
+            profiler.start()
+        else:
+            profiler.enable()
+    except (RuntimeError, ValueError):
+        return None
+    return profiler
+
+
+def save_profile(profiler, trace, total_ms):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_profile_numbers)}-{trace.attrs.get('collection', trace.kind)}-{int(total_ms)}ms"
+    if PROFILE == "pyinstrument":
+        path = os.path.join(PROFILE_DIR, name + ".html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+    else:
+        path = os.path.join(PROFILE_DIR, name + ".prof")
+        profiler.dump_stats(path)
+    return path
+
+
+def stop_profiler(profiler):
+    if PROFILE == "pyinstrument":
+        profiler.stop()
+    else:
+        profiler.disable()
+
+
+# 질문 하나 기록: 끝나면 총 시간을 지표에 더하고 로그에 한 줄 남김 (느리면 프로파일 저장)
+#   이미 질문 기록 안이면(화면 -> answer_question) 바깥 기록에 속성만 더함
+@contextmanager
+def request(kind, **attrs):
+    trace = _current.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+        yield trace
+        return
+    start_metrics_server()
+    trace = Trace(kind, attrs)
+    token = _current.set(trace)
+    profiler = start_profiler()
+    failed = False
+    try:
+        yield trace
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        _current.reset(token)
+        if profiler is not None:
+            stop_profiler(profiler)
+        total_ms = (time.perf_counter() - trace.started) * 1000
+        if failed:
+            trace.attrs["error"] = True
+        labels = {"kind": kind, "collection": trace.attrs.get("collection", ""), "route": trace.attrs.get("route", "")}
+        METRICS.inc("chatbot_requests_total", labels, help="처리한 질문 수")
+        METRICS.observe("chatbot_request_seconds", {"kind": kind, "collection": labels["collection"]}, total_ms / 1000, "질문 하나 처리 시간")
+        if profiler is not None and total_ms >= PROFILE_THRESHOLD_MS:
+            trace.attrs["profile"] = save_profile(profiler, trace, total_ms)
+        logger = trace_logger()
+        if logger is not None:
+            logger.info(json.dumps(trace.to_dict(total_ms), ensure_ascii=False, default=str))
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = METRICS.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server_started = False
+_server_lock = threading.Lock()
+
+
+# EDU_CHATBOT_METRICS_PORT가 있으면 /metrics 서버를 백그라운드 스레드로 한 번만 띄움
+#   (여러 프로세스가 같은 포트를 쓰면 먼저 연 프로세스만 보여줌)
+def start_metrics_server(port=METRICS_PORT):
+    global _server_started
+    with _server_lock:
+        if _server_started or not port:
+            return
+        _server_started = True
+        try:
+            server = ThreadingHTTPServer((METRICS_HOST, int(port)), MetricsHandler)
+        except OSError:
+            return
+    threading.Thread(target=server.serve_forever, daemon=True).start()
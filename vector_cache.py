@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+# 문장별 임베딩 저장 폴더 (문장 내용 해시 -> 벡터, 모델마다 따로)
+VECTOR_DIR = ".embedding_cache"
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+# 문장 목록 -> 인덱스에 넣을 고정 번호 (내용이 같으면 번호도 같음, 같은 문장이 여러 번 나오면 몇 번째인지도 반영)
+def entry_ids(sentences):
+    seen = {}
+    ids = []
+    for sentence in sentences:
+        occurrence = seen.get(sentence, 0)
+        seen[sentence] = occurrence + 1
+        h = hashlib.sha256(f"{sentence}\0{occurrence}".encode("utf-8")).digest()
+        ids.append(int.from_bytes(h[:8], "little") & 0x7FFFFFFFFFFFFFFF)
+    return np.array(ids, dtype=np.int64)
+
+
+# 정규화한 문장 임베딩을 내용 해시로 저장해 두는 캐시
+#   지식 파일에 한 줄을 더하면 그 줄만 새로 인코딩하고 나머지는 저장된 벡터를 그대로 씀
+#   지식 파일(corpus)마다 지금 쓰는 문장 해시를 함께 저장하고, 저장할 때 어느 지식 파일도 쓰지 않는 벡터는 버림
+#   (고친 줄의 예전 벡터가 계속 쌓이지 않게, 예전 형식 파일은 처음 저장할 때 지금 요청한 지식 파일 것만 남음)
+class VectorCache:
+    def __init__(self, model_name, cache_dir=VECTOR_DIR):
+        key = hashlib.sha256(model_name.encode("utf-8")).hexdigest()[:16]
+        self.hashes_path = os.path.join(cache_dir, f"vectors_{key}.json")
+        self.vectors_path = os.path.join(cache_dir, f"vectors_{key}.npy")
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._rows = None
+        self._vectors = None
+        self._corpora = None
+
+    def _load(self):
+        if self._rows is not None:
+            return
+        self._rows = {}
+        self._vectors = None
+        self._corpora = {}
+        if os.path.exists(self.hashes_path) and os.path.exists(self.vectors_path):
+            with open(self.hashes_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            hashes = saved if isinstance(saved, list) else saved["hashes"]
+            vectors = np.load(self.vectors_path, mmap_mode="r")
+            if len(hashes) == len(vectors):
+                self._rows = {h: i for i, h in enumerate(hashes)}
+                self._vectors = vectors
+                self._corpora = {} if isinstance(saved, list) else saved["corpora"]
+
+    def _save(self, hashes, vectors):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.vectors_path + ".tmp", "wb") as f:
+            np.save(f, vectors)
+        with open(self.hashes_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"hashes": hashes, "corpora": self._corpora}, f)
+        os.replace(self.vectors_path + ".tmp", self.vectors_path)
+        os.replace(self.hashes_path + ".tmp", self.hashes_path)
+
+    # 문장 목록의 임베딩 행렬 (없는 문장만 한 번에 인코딩해서 캐시에 추가) -> (행렬, 새로 인코딩한 수)
+    #   corpus: 지식 파일 이름, corpus_sentences: 그 지식 파일의 전체 문장 (sentences가 새 문장 일부일 때)
+    def vectors(self, model, sentences, batch_size=64, corpus=None, corpus_sentences=None):
+        with self._lock:
+            self._load()
+            hashes = [text_hash(s) for s in sentences]
+            missing = list(dict.fromkeys(h for h in hashes if h not in self._rows))
+            changed = False
+            if corpus is not None:
+                used = sorted({text_hash(s) for s in (sentences if corpus_sentences is None else corpus_sentences)})
+                changed = self._corpora.get(corpus) != used
+                self._corpora[corpus] = used
+            if missing or changed:
+                # 어느 지식 파일도 쓰지 않는 예전 벡터는 빼고 저장 (지금 요청한 문장은 남김)
+                live = set(hashes).union(*self._corpora.values())
+                old_hashes = [h for h in sorted(self._rows, key=self._rows.get) if h in live]
+                if self._vectors is None or not old_hashes:
+                    old_vectors = np.zeros((0, 0), dtype=np.float32)
+                else:
+                    old_vectors = np.asarray(self._vectors)[[self._rows[h] for h in old_hashes]]
+                if missing:
+                    texts = {h: s for h, s in zip(hashes, sentences)}
+                    new_vectors = model.encode([texts[h] for h in missing], convert_to_numpy=True, normalize_embeddings=True, batch_size=batch_size)
+                    new_vectors = np.asarray(new_vectors, dtype=np.float32)
+                    all_vectors = np.concatenate([old_vectors, new_vectors]) if old_hashes else new_vectors
+                else:
+                    all_vectors = old_vectors
+                all_hashes = old_hashes + missing
+                self._save(all_hashes, all_vectors)
+                self._rows = {h: i for i, h in enumerate(all_hashes)}
+                self._vectors = all_vectors
+            if not hashes:
+                return np.zeros((0, 0), dtype=np.float32), 0
+            rows = np.array([self._rows[h] for h in hashes], dtype=np.int64)
+            return np.ascontiguousarray(self._vectors[rows], dtype=np.float32), len(missing)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+# 모델별 캐시 (프로세스당 하나)
+def get_vector_cache(model_name):
+    with _caches_lock:
+        if model_name not in _caches:
+            _caches[model_name] = VectorCache(model_name)
+        return _caches[model_name]